@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Замер стоимости разбора одной строки по ее первым двум символам.
+
+Сравнивается прежний способ из Parser.parse (копия атрибутов, три str.replace, цепочка
+сравнений и замыкание add_game на каждую строку) с общей таблицей LINE_PREFIXES,
+а для сравнения приводится и полный iter_parse_events. Строки берутся из того же
+генератора, что и в throughput.py.
+
+Запуск:
+    python benchmarks/classify_lines.py [количество_строк]
+"""
+
+__author__ = "ipetrash"
+
+
+import sys
+import time
+
+from pathlib import Path
+from typing import Callable
+
+DIR = Path(__file__).resolve().parent
+sys.path.append(str(DIR.parent))
+
+from played_games_stream import (
+    ALL_ATTRIBUTES_GAMES,
+    LINE_PREFIXES,
+    CategoryEnum,
+    DiagnosticKind,
+    iter_parse_events,
+)
+from throughput import generate_document
+
+
+NUMBER_LINES = 1_000_000
+
+NUMBER_REPEATS = 3
+
+
+def classify_legacy(lines: list[str]) -> list[tuple]:
+    """Разбор строк как в Parser.parse до появления общей таблицы."""
+
+    result = []
+    platform = None
+
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            continue
+
+        if (
+            all(c not in ALL_ATTRIBUTES_GAMES for c in line[:2])
+            and line.endswith(":")
+        ):
+            platform = line[:-1]
+            continue
+
+        if not platform:
+            continue
+
+        attributes = line[0:2]
+
+        unknown_attributes = str(attributes)
+        for c in ALL_ATTRIBUTES_GAMES:
+            unknown_attributes = unknown_attributes.replace(c, "")
+
+        if unknown_attributes:
+            result.append((platform, CategoryEnum.OTHER, line))
+            continue
+
+        is_finished_watched = attributes == "@ " or attributes == " @"
+        is_not_finished_watched = attributes == "@-" or attributes == "-@"
+
+        is_finished_game = attributes == "  "
+        is_not_finished_game = attributes == "- " or attributes == " -"
+
+        def add_game(category, game_name):
+            result.append((platform, category, game_name))
+
+        if is_finished_game:
+            add_game(CategoryEnum.FINISHED_GAME, line[2:])
+        elif is_not_finished_game:
+            add_game(CategoryEnum.NOT_FINISHED_GAME, line[2:])
+        elif is_finished_watched:
+            add_game(CategoryEnum.FINISHED_WATCHED, line[2:])
+        elif is_not_finished_watched:
+            add_game(CategoryEnum.NOT_FINISHED_WATCHED, line[2:])
+        else:
+            add_game(CategoryEnum.OTHER, line[2:])
+
+    return result
+
+
+def classify_table(lines: list[str]) -> list[tuple]:
+    """Тот же разбор через таблицу LINE_PREFIXES: один поиск на строку."""
+
+    result = []
+    platform = None
+
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            continue
+
+        attributes = line[:2]
+        line_prefix = LINE_PREFIXES[attributes]
+
+        if line_prefix.may_be_platform and line.endswith(":"):
+            platform = line[:-1]
+            continue
+
+        if not platform:
+            continue
+
+        if line_prefix.diagnostic_kind == DiagnosticKind.UNKNOWN_ATTRIBUTE:
+            result.append((platform, CategoryEnum.OTHER, line))
+            continue
+
+        result.append((platform, line_prefix.category, line[2:]))
+
+    return result
+
+
+def parse_events(lines: list[str]) -> list:
+    return list(iter_parse_events(lines))
+
+
+def measure(func: Callable[[list[str]], list], lines: list[str]) -> float:
+    """Функция возвращает лучшее время разбора одной строки в наносекундах."""
+
+    elapsed = []
+    for _ in range(NUMBER_REPEATS):
+        t = time.perf_counter()
+        func(lines)
+        elapsed.append(time.perf_counter() - t)
+
+    return min(elapsed) / len(lines) * 1_000_000_000
+
+
+if __name__ == "__main__":
+    number_lines = int(sys.argv[1]) if len(sys.argv) > 1 else NUMBER_LINES
+
+    lines = generate_document(number_lines).split("\n")
+    print(f"Lines: {len(lines)}")
+
+    # Способы должны разбирать строки одинаково
+    assert classify_legacy(lines) == classify_table(lines)
+
+    legacy = measure(classify_legacy, lines)
+    print(f"    legacy: {legacy:.0f} ns/line")
+
+    for title, func in [
+        ("table", classify_table),
+        ("iter_parse_events", parse_events),
+    ]:
+        elapsed = measure(func, lines)
+        print(f"    {title}: {elapsed:.0f} ns/line ({legacy / elapsed:.2f}x)")
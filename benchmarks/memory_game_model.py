@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Замер памяти, которую занимает объектная модель парсера (Parser.Platform, Parser.Category,
+Parser.Game) в пересчете на одну игру.
+
+Для сравнения из тех же игр строится и прежняя модель (копия классов до перехода
+на __slots__: списки игр по категориям и словарь (имя, категория) -> игра в платформе).
+Названия игр в обеих моделях общие, поэтому в замер не входят.
+
+Запуск:
+    python benchmarks/memory_game_model.py [количество_игр]
+"""
+
+__author__ = "ipetrash"
+
+
+import sys
+import tracemalloc
+
+from collections import defaultdict
+from pathlib import Path
+
+DIR = Path(__file__).resolve().parent
+sys.path.append(str(DIR.parent))
+
+from played_games_parser import Parser, logger
+
+
+ATTRIBUTES = ["  ", "- ", " -", "@ ", " @", "@-", "-@"]
+
+
+def generate_text(number_games: int, number_platforms: int = 100) -> str:
+    games_per_platform = number_games // number_platforms
+
+    lines = []
+    for i in range(number_platforms):
+        lines.append(f"Platform {i}:")
+        for j in range(games_per_platform):
+            lines.append(f"{ATTRIBUTES[j % len(ATTRIBUTES)]}Game {i}.{j}")
+
+    return "\n".join(lines)
+
+
+class LegacyGame:
+    """Parser.Game до перехода на __slots__."""
+
+    def __init__(self, name=None, category=None):
+        self.name = name
+        self.category = category
+
+
+class LegacyCategory:
+    """Parser.Category до перехода на __slots__, игры хранятся в платформе."""
+
+    def __init__(self, kind=None, platform=None):
+        self.kind = kind
+        self.platform = platform
+
+
+class LegacyPlatform:
+    """Parser.Platform до перехода на __slots__."""
+
+    def __init__(self, name=None, owner=None):
+        self.name = name
+        self.owner = owner
+        self.categories = dict()
+
+        # Количество игр на платформе
+        self._count_games = 0
+
+        # Ключом словаря будет вид категории, а значением список игр
+        self._game_list_by_category_kind = defaultdict(list)
+
+        # Используется для проверки дублирующихся в категории игр
+        self._game_name_dict = dict()
+
+    def add_game(self, game_name, category):
+        if (game_name, category.kind) in self._game_name_dict:
+            return
+
+        game = LegacyGame(game_name, category)
+
+        self._game_list_by_category_kind[category.kind].append(game)
+        self._game_name_dict[(game_name, category.kind)] = game
+
+        self._count_games += 1
+
+    def get(self, kind_category):
+        if kind_category not in self.categories:
+            category = LegacyCategory(kind_category, self)
+            self.categories[kind_category] = category
+            return category
+
+        return self.categories[kind_category]
+
+
+def build_legacy_model(p: Parser) -> list[dict[str, LegacyPlatform]]:
+    """Функция строит прежнюю модель из игр модели парсера."""
+
+    result = []
+    for platforms in (p.platforms, p.other.platforms):
+        legacy_platforms = dict()
+        for platform in platforms.values():
+            legacy_platform = LegacyPlatform(platform.name)
+            legacy_platforms[platform.name] = legacy_platform
+
+            for kind, category in platform.categories.items():
+                legacy_category = legacy_platform.get(kind)
+                for game in category:
+                    legacy_platform.add_game(game.name, legacy_category)
+
+        result.append(legacy_platforms)
+
+    return result
+
+
+if __name__ == "__main__":
+    number_games = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    # Логи замеру не нужны
+    logger.disabled = True
+
+    text = generate_text(number_games)
+
+    tracemalloc.start()
+
+    p = Parser()
+    p.build_index(text)
+    size_index, _ = tracemalloc.get_traced_memory()
+
+    p.apply_filter()
+    size_model, _ = tracemalloc.get_traced_memory()
+
+    legacy_model = build_legacy_model(p)
+    size_legacy_model, _ = tracemalloc.get_traced_memory()
+
+    size_legacy_model -= size_model
+    size_model -= size_index
+
+    tracemalloc.stop()
+
+    print(f"Games: {p.count_games}")
+    print(
+        f"Index: {size_index / 1024 / 1024:.1f} MB, "
+        f"{size_index / p.count_games:.1f} B per game"
+    )
+    print(
+        f"Model: {size_model / 1024 / 1024:.1f} MB, "
+        f"{size_model / p.count_games:.1f} B per game"
+    )
+    print(
+        f"Legacy model: {size_legacy_model / 1024 / 1024:.1f} MB, "
+        f"{size_legacy_model / p.count_games:.1f} B per game "
+        f"({size_legacy_model / size_model:.2f}x of model)"
+    )
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Замер времени разбора разделов платформ в пуле процессов в зависимости от числа процессов.
+
+Запуск:
+    python benchmarks/parallel_parse.py [количество_игр]
+"""
+
+__author__ = "ipetrash"
+
+
+import os
+import sys
+import time
+
+from pathlib import Path
+
+DIR = Path(__file__).resolve().parent
+sys.path.append(str(DIR.parent))
+
+from memory_game_model import generate_text
+from mini_played_games_parser import _parse_played_games_chunks
+from played_games_parser import _parse_index_chunks, logger
+from played_games_stream import iter_platform_chunks, parse_chunks
+
+
+def measure(parse_batch, chunks, *args, max_workers: int) -> float:
+    t = time.perf_counter()
+    parse_chunks(parse_batch, chunks, *args, max_workers=max_workers)
+    return time.perf_counter() - t
+
+
+if __name__ == "__main__":
+    number_games = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    # Логи замеру не нужны
+    logger.disabled = True
+
+    text = generate_text(number_games, number_platforms=1000)
+    chunks = list(iter_platform_chunks(text))
+
+    print(f"Games: {number_games}, size: {len(text) / 1024 / 1024:.1f} MB")
+
+    number_workers = [1]
+    while number_workers[-1] * 2 <= (os.cpu_count() or 1):
+        number_workers.append(number_workers[-1] * 2)
+
+    for title, parse_batch, args in [
+        ("Parser.Index", _parse_index_chunks, (True,)),
+        ("parse_played_games", _parse_played_games_chunks, ()),
+    ]:
+        print(title)
+
+        serial = None
+        for max_workers in number_workers:
+            elapsed = measure(parse_batch, chunks, *args, max_workers=max_workers)
+            if serial is None:
+                serial = elapsed
+
+            print(
+                f"    Workers: {max_workers}, elapsed: {elapsed:.3f} sec, "
+                f"speedup: {serial / elapsed:.2f}x"
+            )
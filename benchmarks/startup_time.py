@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Замер времени запуска gui.py: время импорта модулей по -X importtime и время
+до показа первого окна.
+
+Каждый замер выполняется в отдельном процессе, чтобы модули не были уже импортированы.
+Если импорт gui дольше бюджета или при запуске импортируются модули, которые нужны
+только для загрузки по сети или разбора в пуле процессов, то скрипт завершится с кодом 1.
+
+Запуск:
+    python benchmarks/startup_time.py [бюджет_импорта_мс]
+"""
+
+__author__ = "ipetrash"
+
+
+import statistics
+import subprocess
+import sys
+import time
+
+from pathlib import Path
+
+DIR = Path(__file__).resolve().parent
+ROOT_DIR = DIR.parent
+
+
+# Бюджет на импорт gui по умолчанию, вместе с PyQt5
+IMPORT_TIME_BUDGET_MS = 300
+
+NUMBER_RUNS = 5
+
+# Модули, которые не должны импортироваться до первой загрузки по сети
+# или до разбора большого текста в пуле процессов
+LAZY_MODULES = [
+    "urllib.request",
+    "http.client",
+    "ssl",
+    "concurrent.futures.process",
+    "logging.handlers",
+]
+
+FIRST_WINDOW_MARKER = "FIRST_WINDOW"
+
+# Запуск как в gui.py, но без обновления по ссылке: окно с результатом из снимка
+FIRST_WINDOW_CODE = f"""
+import sys
+import time
+
+t = time.perf_counter()
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+import gui
+
+app = QApplication(sys.argv)
+
+mw = gui.MainWindow()
+mw.show()
+mw.load_snapshot()
+
+def on_shown():
+    print("{FIRST_WINDOW_MARKER}", time.perf_counter() - t, flush=True)
+    app.quit()
+
+# Срабатывает, когда цикл событий обработал показ окна
+QTimer.singleShot(0, on_shown)
+app.exec_()
+"""
+
+
+def parse_import_time(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Функция разбирает вывод -X importtime в список кортежей
+    (модуль, вложенность, собственное время в мкс, общее время в мкс).
+
+    """
+
+    items = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # После разделителя идет пробел, а затем по два пробела на уровень вложенности
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        items.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+
+    return items
+
+
+def measure_import_time(module: str = "gui") -> list[tuple[str, int, int, int]]:
+    """Функция возвращает модули, импортированные при импорте module. Модули, которые
+    импортирует сам интерпретатор при запуске, отбрасываются. Последним идет module.
+
+    """
+
+    rs = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if rs.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{rs.stderr[-2000:]}")
+
+    items = parse_import_time(rs.stderr)
+
+    # Модули верхнего уровня до module импортированы при запуске интерпретатора
+    start = len(items) - 1
+    while start > 0 and items[start - 1][1] > 0:
+        start -= 1
+
+    return items[start:]
+
+
+def measure_first_window() -> tuple[float, float]:
+    """Функция возвращает время до показа первого окна с момента запуска процесса
+    и с начала выполнения кода, то есть без запуска интерпретатора.
+
+    """
+
+    t = time.perf_counter()
+    with subprocess.Popen(
+        [sys.executable, "-c", FIRST_WINDOW_CODE],
+        cwd=ROOT_DIR,
+        stdout=subprocess.PIPE,
+        text=True,
+    ) as process:
+        for line in process.stdout:
+            if line.startswith(FIRST_WINDOW_MARKER):
+                elapsed = time.perf_counter() - t
+                in_process = float(line.split()[1])
+                break
+        else:
+            raise RuntimeError("Окно не было показано")
+
+        process.communicate()
+
+    return elapsed, in_process
+
+
+if __name__ == "__main__":
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_TIME_BUDGET_MS
+
+    runs = [measure_import_time() for _ in range(NUMBER_RUNS)]
+
+    # Для отчета берется самый быстрый запуск, на него меньше всего влияет система
+    items = min(runs, key=lambda items: items[-1][3])
+    total_ms = items[-1][3] / 1000
+
+    print(f"Import gui: {total_ms:.1f} ms (budget: {budget_ms:.0f} ms)")
+    for name, _, _, cumulative_us in sorted(
+        (item for item in items if item[1] == 1), key=lambda x: -x[3]
+    ):
+        print(f"    {name}: {cumulative_us / 1000:.1f} ms")
+
+    imported = {name for name, *_ in items}
+    eager_modules = [name for name in LAZY_MODULES if name in imported]
+    if eager_modules:
+        print(f"Imported at startup: {', '.join(eager_modules)}")
+
+    first_window = [measure_first_window() for _ in range(NUMBER_RUNS)]
+    print(
+        f"First window: {statistics.median(t for t, _ in first_window) * 1000:.1f} ms, "
+        f"without interpreter startup: "
+        f"{statistics.median(t for _, t in first_window) * 1000:.1f} ms"
+    )
+
+    if total_ms > budget_ms or eager_modules:
+        sys.exit(1)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Замер пропускной способности парсеров на синтетических списках игр.
+
+Генератор с фиксированным seed строит документы, похожие на настоящий список:
+много платформ, все атрибуты из FLAG_BY_CATEGORY, названия с частями вида "Foo 1-3"
+и "Bar 4, 5, 6", дубликаты и строки странного формата. На документах из 1 тыс.,
+100 тыс. и 1 млн строк замеряются Parser.parse с фильтром, сортировкой и разбором
+частей и без них, с показом одной категории, а также parse_played_games.
+
+Результаты (строк в секунду и пиковая память) сохраняются в JSON. Если файл уже есть,
+то новые результаты сравниваются с ним, а при замедлении больше допустимого скрипт
+завершится с кодом 1. Файл перезаписывается только с ключом --update.
+
+Запуск:
+    python benchmarks/throughput.py [--lines 1000 100000] [--baseline файл] [--update]
+"""
+
+__author__ = "ipetrash"
+
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from pathlib import Path
+from typing import Callable
+
+DIR = Path(__file__).resolve().parent
+sys.path.append(str(DIR.parent))
+
+from mini_played_games_parser import FLAG_BY_CATEGORY, parse_played_games
+from played_games_parser import Parser, logger
+from played_games_stream import CategoryEnum
+
+
+SEED = 42
+
+NUMBER_LINES = [1_000, 100_000, 1_000_000]
+
+BASELINE_FILE_NAME = DIR / "throughput_baseline.json"
+
+# Замедление относительно базовой линии, которое считается регрессией
+MAX_SLOWDOWN = 0.10
+
+# Сколько раз повторяется замер, берется лучший результат
+NUMBER_REPEATS = 3
+
+# Средний размер платформы в строках
+LINES_PER_PLATFORM = 500
+
+# Атрибуты строк странного формата: неизвестные символы и неизвестные сочетания
+MALFORMED_ATTRIBUTES = ["? ", "x-", "--", "@@", " *"]
+
+# Слова, из которых составляются названия игр
+WORDS = (
+    "Dark Legend Quest Souls Night Final Fantasy Resident Evil Shadow Heroes Might "
+    "Magic Kingdom Tales Star War Dragon Age Silent Hill Metal Gear Prince Persia"
+).split()
+
+ROMAN_NUMBERS = "I II III IV V VI VII VIII IX X".split()
+
+
+def generate_document(number_lines: int, seed: int = SEED) -> str:
+    """Функция генерирует список игр из number_lines строк. При одинаковом seed
+    документ всегда один и тот же.
+
+    """
+
+    rnd = random.Random(seed)
+    attributes = list(FLAG_BY_CATEGORY)
+
+    def get_game_name() -> str:
+        name = " ".join(rnd.sample(WORDS, rnd.randint(1, 3)))
+
+        value = rnd.random()
+        if value < 0.05:
+            start = rnd.randint(1, 5)
+            return f"{name} {start}-{start + rnd.randint(1, 4)}"
+
+        if value < 0.08:
+            start = rnd.randint(1, 5)
+            return f"{name} {', '.join(map(str, range(start, start + 3)))}"
+
+        if value < 0.10:
+            start = rnd.randint(0, 5)
+            return f"{name} {', '.join(ROMAN_NUMBERS[start : start + 2])}"
+
+        if value < 0.40:
+            return f"{name} {rnd.randint(1, 9)}"
+
+        return f"{name} {rnd.randint(1, 100_000)}"
+
+    lines = []
+
+    # Строки игр текущей платформы, из них берутся дубликаты
+    platform_lines = None
+
+    while len(lines) < number_lines:
+        if platform_lines is None or rnd.random() < 1 / LINES_PER_PLATFORM:
+            platform_lines = []
+            lines.append(f"Platform {rnd.randint(1, number_lines // 100 + 10)}:")
+            continue
+
+        value = rnd.random()
+        if value < 0.02 and platform_lines:
+            # Дубликат игры этой платформы
+            line = rnd.choice(platform_lines)
+        elif value < 0.03:
+            line = rnd.choice(MALFORMED_ATTRIBUTES) + get_game_name()
+        elif value < 0.04:
+            line = ""
+        else:
+            line = rnd.choice(attributes) + get_game_name()
+            platform_lines.append(line)
+
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def _parse(**kwargs) -> Callable[[str], object]:
+    def parse(text: str):
+        Parser().parse(text, **kwargs)
+
+    return parse
+
+
+SCENARIOS: dict[str, Callable[[str], object]] = {
+    "Parser.parse": _parse(),
+    "Parser.parse, no sequence": _parse(parse_game_name_on_sequence=False),
+    "Parser.parse, filter": _parse(filter_exp="Dark*"),
+    "Parser.parse, sort": _parse(sort_game=True),
+    "Parser.parse, filter, sort, ignore case": _parse(
+        filter_exp="dark*", sort_game=True, filter_ignore_case=True
+    ),
+    "Parser.parse, one category": _parse(
+        show_only_categories=(CategoryEnum.NOT_FINISHED_WATCHED,)
+    ),
+    "parse_played_games": lambda text: parse_played_games(text, silence=True),
+}
+
+
+def measure(func: Callable[[str], object], text: str, repeats: int) -> dict:
+    elapsed = min(_get_elapsed(func, text) for _ in range(repeats))
+
+    # Под tracemalloc разбор заметно медленнее, поэтому память замеряется отдельно
+    tracemalloc.start()
+    try:
+        func(text)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    number_lines = text.count("\n") + 1
+    return {
+        "lines_per_sec": round(number_lines / elapsed),
+        "peak_memory_mb": round(peak_memory / 1024 / 1024, 2),
+    }
+
+
+def _get_elapsed(func: Callable[[str], object], text: str) -> float:
+    t = time.perf_counter()
+    func(text)
+    return time.perf_counter() - t
+
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    """Функция печатает изменения относительно базовой линии и возвращает
+    названия замеров, которые замедлились больше MAX_SLOWDOWN.
+
+    """
+
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+
+        speed = result["lines_per_sec"] / base["lines_per_sec"] - 1
+        memory = result["peak_memory_mb"] - base["peak_memory_mb"]
+        print(f"    {key}: speed {speed:+.1%}, peak memory {memory:+.2f} MB")
+
+        if speed < -MAX_SLOWDOWN:
+            regressions.append(key)
+
+    return regressions
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    arg_parser.add_argument("--lines", type=int, nargs="+", default=NUMBER_LINES)
+    arg_parser.add_argument("--baseline", type=Path, default=BASELINE_FILE_NAME)
+    arg_parser.add_argument("--repeats", type=int, default=NUMBER_REPEATS)
+    arg_parser.add_argument(
+        "--update", action="store_true", help="перезаписать базовую линию"
+    )
+    args = arg_parser.parse_args()
+
+    # Логи замеру не нужны
+    logger.disabled = True
+
+    results = dict()
+    for number_lines in args.lines:
+        text = generate_document(number_lines)
+        print(f"Lines: {number_lines}, size: {len(text) / 1024 / 1024:.1f} MB")
+
+        for title, func in SCENARIOS.items():
+            result = measure(func, text, args.repeats)
+            results[f"{title} [{number_lines}]"] = result
+
+            print(
+                f"    {title}: {result['lines_per_sec']} lines/sec, "
+                f"peak memory: {result['peak_memory_mb']} MB"
+            )
+
+    regressions = []
+    if args.baseline.exists() and not args.update:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        print(f"Compared with {args.baseline}:")
+        regressions = compare(results, baseline["results"])
+    else:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "seed": SEED,
+                    "results": results,
+                },
+                f,
+                ensure_ascii=False,
+                indent=4,
+            )
+
+        print(f"Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"Regressions (slower than {MAX_SLOWDOWN:.0%}): {', '.join(regressions)}")
+        sys.exit(1)
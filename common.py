@@ -4,25 +4,151 @@
 __author__ = 'ipetrash'
 
 
+import atexit
 import logging
 import sys
+import threading
 
 
-def get_logger(name, file='log.txt', encoding='utf8'):
+# Слушатели очередей асинхронных логгеров по имени логгера
+LISTENERS = dict()
+
+
+class LazyHandler(logging.Handler):
+    """
+    Обработчик, который настраивает логгер при первой записи: создает настоящие
+    обработчики через configure, ставит их на свое место и передает им запись.
+
+    Пока в лог ничего не пишется, файл лога не открывается, а поток асинхронного
+    логгера не запускается.
+
+    """
+
+    def __init__(self, log, configure):
+        super().__init__()
+
+        self.log = log
+        self.configure = configure
+        self.handlers = None
+        self._configure_lock = threading.Lock()
+
+    def handle(self, record):
+        if self.handlers is None:
+            with self._configure_lock:
+                if self.handlers is None:
+                    handlers = self.configure()
+
+                    # Список заменяется целиком: по старому списку сейчас идет
+                    # Logger.callHandlers, и запись не должна попасть в обработчики дважды
+                    self.log.handlers = handlers + [
+                        h for h in self.log.handlers if h is not self
+                    ]
+
+                    self.handlers = handlers
+
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+        return True
+
+    def emit(self, record):
+        pass
+
+
+def stop_listeners():
+    """Функция дописывает очереди асинхронных логгеров и останавливает их потоки."""
+
+    while LISTENERS:
+        _, listener = LISTENERS.popitem()
+        listener.stop()
+
+
+atexit.register(stop_listeners)
+
+
+def get_logger(
+    name,
+    file='log.txt',
+    encoding='utf8',
+    asynchronous=False,
+    file_level=logging.DEBUG,
+    stdout_level=logging.DEBUG,
+    lazy=True,
+):
+    """
+    Функция возвращает логгер, который пишет в файл file и в stdout.
+
+    Обработчики добавляются только при первом вызове для логгера с этим именем,
+    повторные вызовы возвращают уже настроенный логгер.
+
+    При asynchronous=True логгер только кладет записи в очередь, а в файл и stdout
+    их пишет фоновый поток. Очередь дописывается при завершении программы.
+
+    При lazy=True обработчики создаются при первой записи в лог, поэтому получение
+    логгера при импорте модуля ничего не стоит.
+
+    """
+
     log = logging.getLogger(name)
-    log.setLevel(logging.DEBUG)
+    if log.handlers:
+        return log
+
+    # Записи ниже уровня всех обработчиков отбрасываются сразу, без очереди
+    levels = [stdout_level]
+    if file is not None:
+        levels.append(file_level)
+    log.setLevel(min(levels))
+
+    def configure():
+        return _create_handlers(
+            name, file, encoding, asynchronous, file_level, stdout_level
+        )
+
+    if lazy:
+        log.addHandler(LazyHandler(log, configure))
+    else:
+        for handler in configure():
+            log.addHandler(handler)
+
+    return log
 
+
+def _create_handlers(name, file, encoding, asynchronous, file_level, stdout_level):
     formatter = logging.Formatter('[%(asctime)s] %(filename)s[LINE:%(lineno)d] %(levelname)-8s %(message)s')
 
+    handlers = []
+
     if file is not None:
         fh = logging.FileHandler(file, encoding=encoding)
-        fh.setLevel(logging.DEBUG)
+        fh.setLevel(file_level)
         fh.setFormatter(formatter)
-        log.addHandler(fh)
+        handlers.append(fh)
 
     ch = logging.StreamHandler(stream=sys.stdout)
-    ch.setLevel(logging.DEBUG)
+    ch.setLevel(stdout_level)
     ch.setFormatter(formatter)
-    log.addHandler(ch)
+    handlers.append(ch)
 
-    return log
+    if not asynchronous:
+        return handlers
+
+    # Модуль тянет за собой socket и pickle, поэтому импортируется только здесь
+    import queue
+
+    from logging.handlers import QueueHandler, QueueListener
+
+    class LocalQueueHandler(QueueHandler):
+        # Записи разбираются в этом же процессе, поэтому их не нужно заранее форматировать
+        # и копировать: форматирование выполнит обработчик в фоновом потоке
+        def prepare(self, record):
+            return record
+
+    log_queue = queue.SimpleQueue()
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    LISTENERS[name] = listener
+
+    return [LocalQueueHandler(log_queue)]
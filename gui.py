@@ -4,31 +4,73 @@
 __author__ = "ipetrash"
 
 
-from io import StringIO
 import json
 import os
-import time
 import traceback
 import sys
 
-from urllib.request import urlopen
-from urllib.parse import urljoin
-
-from lxml import etree
-
 
+# Импортируются только нужные классы, а не все содержимое модулей Qt
 try:
-    from PyQt5.QtWidgets import *
-    from PyQt5.QtCore import *
+    from PyQt5.QtWidgets import (
+        QApplication,
+        QCheckBox,
+        QDockWidget,
+        QFormLayout,
+        QGroupBox,
+        QHBoxLayout,
+        QLabel,
+        QLineEdit,
+        QMainWindow,
+        QMessageBox,
+        QProgressBar,
+        QPushButton,
+        QTreeView,
+        QVBoxLayout,
+        QWidget,
+    )
+    from PyQt5.QtCore import (
+        QAbstractItemModel,
+        QByteArray,
+        QModelIndex,
+        QPoint,
+        QThread,
+        Qt,
+        pyqtSignal,
+    )
 except:
-    from PyQt4.QtGui import *
-    from PyQt4.QtCore import *
+    from PyQt4.QtGui import (
+        QApplication,
+        QCheckBox,
+        QDockWidget,
+        QFormLayout,
+        QGroupBox,
+        QHBoxLayout,
+        QLabel,
+        QLineEdit,
+        QMainWindow,
+        QMessageBox,
+        QProgressBar,
+        QPushButton,
+        QTreeView,
+        QVBoxLayout,
+        QWidget,
+    )
+    from PyQt4.QtCore import (
+        QAbstractItemModel,
+        QByteArray,
+        QModelIndex,
+        QPoint,
+        QThread,
+        Qt,
+        pyqtSignal,
+    )
 
 
 from common import get_logger
 
 
-logger = get_logger("played_games")
+logger = get_logger("played_games", asynchronous=True)
 
 
 DEFAULT_URL = "https://gist.github.com/gil9red/2f80a34fb601cd685353"
@@ -46,18 +88,16 @@ def log_uncaught_exceptions(ex_cls, ex, tb):
 sys.excepthook = log_uncaught_exceptions
 
 
-def add_tree_widget_item_platform(platform):
-    return QTreeWidgetItem([f"{platform.name} ({platform.count_games}):"])
+def get_platform_title(platform):
+    return f"{platform.name} ({platform.count_games}):"
 
 
-def add_tree_widget_item_category(category):
-    return QTreeWidgetItem(
-        [f"{ENUM_CATEGORY_TITLE_DICT[category.kind]} ({category.count}):"]
-    )
+def get_category_title(category):
+    return f"{ENUM_CATEGORY_TITLE_DICT[category.kind]} ({category.count}):"
 
 
-def add_tree_widget_item_game(game):
-    return QTreeWidgetItem([game.name])
+def get_other_title(other):
+    return f"{OTHER_GAME_TITLE} ({other.count_games}):"
 
 
 WINDOW_TITLE = "Played Games"
@@ -66,8 +106,36 @@ OTHER_GAME_TITLE = "Неопределенные игры"
 
 CONFIG_FILE = "config"
 
+# Сколько строк игр добавляется в дерево за раз, остальные -- по мере прокрутки
+FETCH_GAMES_BATCH_SIZE = 200
+
+# Сколько замечаний к тексту показывается в подсказке строки состояния
+DIAGNOSTICS_TOOLTIP_SIZE = 20
+
+# Кэш загруженных страниц гиста и файлов: при обновлении без изменений
+# сервер отвечает 304 и файл заново не скачивается
+FETCH_CACHE_DIR = "fetch_cache"
+FETCH_CACHE_MAX_SIZE = 50 * 1024 * 1024
 
+
+from played_games_fetch import (
+    DEFAULT_TIMEOUT,
+    FetchCache,
+    FetchCancelled,
+    fetch_gist_text,
+)
 from played_games_parser import Parser
+from played_games_profile import ParseStats
+from played_games_snapshot import (
+    get_file_hash,
+    get_snapshot_file_name,
+    get_text_hash,
+    load_snapshot,
+    save_snapshot,
+)
+
+# Максимальное время загрузки страницы гиста и файла в секундах
+FETCH_TIMEOUT = DEFAULT_TIMEOUT
 
 ENUM_CATEGORY_TITLE_DICT = {
     Parser.CategoryEnum.FINISHED_GAME: "Пройденные",
@@ -85,18 +153,486 @@ SEQ_ADDED_CATEGORIES = [
 ]
 
 
+class GamesTreeModel(QAbstractItemModel):
+    """Модель дерева игр, данные которой берутся прямо из платформ и категорий парсера.
+
+    Узлы создаются только для платформ и категорий, а строки игр -- это индексы
+    в списке игр категории, который создается при первом раскрытии. Строки игр
+    добавляются порциями через canFetchMore/fetchMore, поэтому память и время
+    отрисовки зависят от показанных строк, а не от общего количества игр.
+
+    При новом результате фильтрации модель не сбрасывается: узлы сравниваются
+    с новым результатом, и сигналы отправляются только для добавленных, удаленных,
+    переставленных и изменившихся строк. Поэтому раскрытые узлы, выделение
+    и прокрутка дерева сохраняются.
+
+    """
+
+    class Node:
+        """Узел дерева. Узел с играми содержит список игр вместо дочерних узлов."""
+
+        __slots__ = (
+            "parent",
+            "row",
+            "key",
+            "source",
+            "title",
+            "children",
+            "is_games",
+            "_games",
+            "number_fetched",
+        )
+
+        def __init__(self, key=None, source=None, title=None, is_games=False):
+            self.parent = None
+            self.row = 0
+
+            # Ключ узла среди соседей: имя платформы или вид категории
+            self.key = key
+            self.source = source
+            self.title = title
+            self.children = list()
+
+            self.is_games = is_games
+            self._games = None
+            self.number_fetched = 0
+
+        @property
+        def games(self):
+            if self._games is None:
+                # Платформа неопределенных игр показывает игры всех своих категорий
+                if isinstance(self.source, Parser.Category):
+                    self._games = self.source.game_list
+                else:
+                    self._games = [
+                        game
+                        for category in self.source.categories.values()
+                        for game in category
+                    ]
+
+            return self._games
+
+        @property
+        def count_games(self):
+            return (
+                self.source.count
+                if isinstance(self.source, Parser.Category)
+                else self.source.count_games
+            )
+
+        def update_rows(self):
+            for row, child in enumerate(self.children):
+                child.parent = self
+                child.row = row
+
+    # Ключ узла неопределенных игр
+    OTHER_KEY = None
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.header = TREE_HEADER
+        self._root = GamesTreeModel.Node()
+
+    def set_parser(self, parser):
+        """Функция обновляет модель по результату фильтрации парсера."""
+
+        # Описание узлов: (ключ, источник, заголовок, узел с играми, дочерние узлы)
+        items = []
+        for name, platform in parser.sorted_platforms:
+            categories = [
+                (
+                    kind,
+                    platform.categories[kind],
+                    get_category_title(platform.categories[kind]),
+                    True,
+                    None,
+                )
+                for kind in SEQ_ADDED_CATEGORIES
+                if kind in platform.categories
+            ]
+            items.append(
+                (name, platform, get_platform_title(platform), False, categories)
+            )
+
+        if parser.other.count_games > 0:
+            other_platforms = [
+                (name, platform, get_platform_title(platform), True, None)
+                for name, platform in parser.other.platforms.items()
+            ]
+            items.append(
+                (
+                    GamesTreeModel.OTHER_KEY,
+                    parser.other,
+                    get_other_title(parser.other),
+                    False,
+                    other_platforms,
+                )
+            )
+
+        self._update_children(QModelIndex(), self._root, items)
+
+    @staticmethod
+    def _create_node(key, source, title, is_games, children):
+        node = GamesTreeModel.Node(key, source, title, is_games)
+        for item in children or ():
+            node.children.append(GamesTreeModel._create_node(*item))
+
+        node.update_rows()
+        return node
+
+    def _update_children(self, parent_index, node, items):
+        keys = {item[0] for item in items}
+
+        # Удаление узлов, которых нет в новом результате
+        for row in reversed(range(len(node.children))):
+            if node.children[row].key not in keys:
+                self.beginRemoveRows(parent_index, row, row)
+                del node.children[row]
+                node.update_rows()
+                self.endRemoveRows()
+
+        for row, (key, source, title, is_games, children) in enumerate(items):
+            if row >= len(node.children) or node.children[row].key != key:
+                old_row = next(
+                    (
+                        i
+                        for i in range(row + 1, len(node.children))
+                        if node.children[i].key == key
+                    ),
+                    None,
+                )
+
+                # Новый узел
+                if old_row is None:
+                    self.beginInsertRows(parent_index, row, row)
+                    node.children.insert(
+                        row,
+                        GamesTreeModel._create_node(
+                            key, source, title, is_games, children
+                        ),
+                    )
+                    node.update_rows()
+                    self.endInsertRows()
+                    continue
+
+                # Узел поменял позицию, например, после сортировки платформ
+                self.beginMoveRows(parent_index, old_row, old_row, parent_index, row)
+                node.children.insert(row, node.children.pop(old_row))
+                node.update_rows()
+                self.endMoveRows()
+
+            child = node.children[row]
+            index = self.createIndex(row, 0, node)
+
+            if child.is_games:
+                self._update_games(index, child, source)
+            else:
+                child.source = source
+                self._update_children(index, child, children)
+
+            if child.title != title:
+                child.title = title
+                self.dataChanged.emit(index, index)
+
+    def _update_games(self, index, node, source):
+        # Объекты платформ и категорий, которые не поменялись, парсер переиспользует
+        if source is node.source:
+            return
+
+        old_games = node.games
+        old_number_fetched = node.number_fetched
+
+        node.source = source
+        node._games = None
+
+        # Строки игр еще не добавлялись, поэтому сообщать не о чем
+        if not old_number_fetched:
+            return
+
+        new_games = node.games
+
+        # Добавляется столько же игр, сколько было. Если были добавлены все игры,
+        # то не меньше одной порции, остальные подгрузит fetchMore
+        if old_number_fetched == len(old_games):
+            new_number_fetched = min(
+                len(new_games), max(old_number_fetched, FETCH_GAMES_BATCH_SIZE)
+            )
+        else:
+            new_number_fetched = min(old_number_fetched, len(new_games))
+
+        old_names = [game.name for game in old_games[:old_number_fetched]]
+        new_names = [game.name for game in new_games[:new_number_fetched]]
+
+        # Совпадающие начало и конец списков не трогаются
+        max_common = min(len(old_names), len(new_names))
+
+        prefix = 0
+        while prefix < max_common and old_names[prefix] == new_names[prefix]:
+            prefix += 1
+
+        suffix = 0
+        while (
+            suffix < max_common - prefix
+            and old_names[-1 - suffix] == new_names[-1 - suffix]
+        ):
+            suffix += 1
+
+        removed = len(old_names) - prefix - suffix
+        if removed:
+            self.beginRemoveRows(index, prefix, prefix + removed - 1)
+            node.number_fetched -= removed
+            self.endRemoveRows()
+
+        inserted = len(new_names) - prefix - suffix
+        if inserted:
+            self.beginInsertRows(index, prefix, prefix + inserted - 1)
+            node.number_fetched += inserted
+            self.endInsertRows()
+
+    def set_header(self, header):
+        self.header = header
+        self.headerDataChanged.emit(Qt.Horizontal, 0, 0)
+
+    def get_node(self, index):
+        """Функция возвращает узел по индексу или None, если это строка игры."""
+
+        if not index.isValid():
+            return self._root
+
+        parent_node = index.internalPointer()
+        if parent_node.is_games:
+            return None
+
+        return parent_node.children[index.row()]
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+
+        return self.createIndex(row, column, self.get_node(parent))
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+
+        parent_node = index.internalPointer()
+        if parent_node is self._root:
+            return QModelIndex()
+
+        return self.createIndex(parent_node.row, 0, parent_node.parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+
+        node = self.get_node(parent)
+        if node is None:
+            return 0
+
+        if node.is_games:
+            return node.number_fetched
+
+        return len(node.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.get_node(parent)
+        if node is None:
+            return False
+
+        if node.is_games:
+            return node.count_games > 0
+
+        return bool(node.children)
+
+    def canFetchMore(self, parent):
+        node = self.get_node(parent)
+        return (
+            node is not None
+            and node.is_games
+            and node.number_fetched < node.count_games
+        )
+
+    def fetchMore(self, parent):
+        node = self.get_node(parent)
+        if node is None or not node.is_games:
+            return
+
+        number = min(FETCH_GAMES_BATCH_SIZE, node.count_games - node.number_fetched)
+        if number <= 0:
+            return
+
+        self.beginInsertRows(
+            parent, node.number_fetched, node.number_fetched + number - 1
+        )
+        node.number_fetched += number
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+
+        parent_node = index.internalPointer()
+        if parent_node.is_games:
+            return parent_node.games[index.row()].name
+
+        return parent_node.children[index.row()].title
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section == 0:
+            return self.header
+
+        return None
+
+
+class FetchWorker(QThread):
+    """Поток загрузки и разбора списка игр, чтобы интерфейс не зависал на время запросов.
+
+    Результат -- путь к файлу, текст (при загрузке по ссылке), построенный индекс
+    и хеш текста, отображается он уже в потоке интерфейса. Если хеш текста совпал
+    с text_hash, то текст не разбирается, а вместо индекса передается None.
+
+    """
+
+    progress = pyqtSignal(str, int, int)
+    result_ready = pyqtSignal(object, object, object, object)
+    error = pyqtSignal(str)
+
+    def __init__(
+        self,
+        url,
+        file_name,
+        index,
+        parse_game_name_on_sequence,
+        cache,
+        text_hash=None,
+        parent=None,
+    ):
+        super().__init__(parent)
+
+        self.url = url
+        self.file_name = file_name
+        self.cache = cache
+
+        # Копия текущего индекса, по которой заново разбираются только изменившиеся
+        # платформы. None -- индекс строится заново
+        self.index = index
+        self.parse_game_name_on_sequence = parse_game_name_on_sequence
+
+        # Хеш текста, по которому построен текущий индекс
+        self.text_hash = text_hash
+
+        self._is_cancelled = False
+
+    def cancel(self):
+        self._is_cancelled = True
+
+    def is_cancelled(self):
+        return self._is_cancelled
+
+    def run(self):
+        try:
+            content = None
+            index = None
+
+            if self.file_name:
+                text_hash = get_file_hash(self.file_name)
+                if text_hash != self.text_hash:
+                    index = Parser.Index(self.parse_game_name_on_sequence)
+                    index.build_from_file(self.file_name)
+            else:
+                logger.debug("Fetch last revision start.")
+
+                content = fetch_gist_text(
+                    self.url,
+                    FETCH_TIMEOUT,
+                    self.progress.emit,
+                    self.is_cancelled,
+                    self.cache,
+                )
+                logger.debug("Fetch last revision finish.")
+
+                text_hash = get_text_hash(content)
+                if text_hash != self.text_hash:
+                    index = self.index
+                    if index is None:
+                        index = Parser.Index(self.parse_game_name_on_sequence)
+                        index.build(content)
+                    else:
+                        index.update(content)
+
+            if self.is_cancelled():
+                raise FetchCancelled(self.url)
+
+            if index is None:
+                logger.debug("Content not changed.")
+            else:
+                self._save_snapshot(index, text_hash)
+
+            self.result_ready.emit(self.file_name, content, index, text_hash)
+
+        except FetchCancelled:
+            logger.debug("Fetch cancelled.")
+
+        except Exception:
+            text = traceback.format_exc()
+            logger.error(text)
+            self.error.emit(text)
+
+    def _save_snapshot(self, index, text_hash):
+        # Без снимка приложение работает, просто следующий запуск будет дольше
+        try:
+            file_name = get_snapshot_file_name(
+                get_source_name(self.url, self.file_name)
+            )
+            save_snapshot(file_name, index, text_hash)
+
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить снимок: {e}")
+
+
+def get_source_name(url, file_name):
+    """Функция возвращает имя источника текста, по которому ищется его снимок."""
+
+    return os.path.abspath(file_name) if file_name else url
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
 
         self.setWindowTitle(WINDOW_TITLE)
 
-        self.tree_games = QTreeWidget()
+        self.tree_model = GamesTreeModel()
+
+        self.tree_games = QTreeView()
+        self.tree_games.setUniformRowHeights(True)
+        self.tree_games.setModel(self.tree_model)
+
+        # Раскрываются только новые платформы и категории, остальные узлы
+        # остаются такими, какими их оставил пользователь
+        self.tree_model.rowsInserted.connect(self._expand_inserted)
+
+        # Игры добавляются в дерево по мере того, как доходят до видимой области
+        self.tree_games.expanded.connect(self.fetch_visible_games)
+        self.tree_games.verticalScrollBar().valueChanged.connect(
+            self.fetch_visible_games
+        )
 
         self.line_edit_url = QLineEdit(DEFAULT_URL)
         self.button_refresh_by_url = QPushButton("&Refresh")
         self.button_refresh_by_url.clicked.connect(self.refresh_by_url)
 
+        self.progress_bar_fetch = QProgressBar()
+        self.progress_bar_fetch.hide()
+
+        self.button_cancel_fetch = QPushButton("&Cancel")
+        self.button_cancel_fetch.clicked.connect(self.cancel_refresh)
+        self.button_cancel_fetch.hide()
+
         self.dock_widget_settings = QDockWidget("Settings")
         self.dock_widget_settings.setObjectName(self.dock_widget_settings.windowTitle())
         layout = QFormLayout()
@@ -108,6 +644,10 @@ class MainWindow(QMainWindow):
         self.SORT_GAME.toggled.connect(self.SORT_REVERSE.setVisible)
         self.SORT_GAME.toggled.connect(label_SORT_REVERSE.setVisible)
 
+        # Замеры этапов разбора включаются по запросу и в настройках не сохраняются
+        self.PROFILE_PARSER = QCheckBox()
+        self.PROFILE_PARSER.toggled.connect(self.set_profiling)
+
         self.TEST_USING_FILE_GAMES.setChecked(True)
         self.PARSE_GAME_NAME_ON_SEQUENCE.setChecked(True)
         self.SORT_GAME.setChecked(False)
@@ -120,6 +660,7 @@ class MainWindow(QMainWindow):
         layout.addRow("PARSE_GAME_NAME_ON_SEQUENCE", self.PARSE_GAME_NAME_ON_SEQUENCE)
         layout.addRow("SORT_GAME", self.SORT_GAME)
         layout.addRow(label_SORT_REVERSE, self.SORT_REVERSE)
+        layout.addRow("PROFILE_PARSER", self.PROFILE_PARSER)
 
         # TODO: может в checkbox'ах показывать количество игр данных категорий
         self.check_FINISHED_GAME = QCheckBox(Parser.CategoryEnum.FINISHED_GAME.name)
@@ -161,10 +702,13 @@ class MainWindow(QMainWindow):
         general_tool_bar = self.addToolBar("General")
         general_tool_bar.setObjectName(general_tool_bar.windowTitle())
         general_tool_bar.addAction(self.dock_widget_settings.toggleViewAction())
+        general_tool_bar.addAction("Profile", self.show_profile)
 
         layout = QHBoxLayout()
         layout.addWidget(self.line_edit_url)
         layout.addWidget(self.button_refresh_by_url)
+        layout.addWidget(self.progress_bar_fetch)
+        layout.addWidget(self.button_cancel_fetch)
 
         self.line_edit_filter = QLineEdit()
         self.line_edit_filter.setToolTip("Wildcard Filter")
@@ -185,76 +729,162 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(central_widget)
 
         self.parser = Parser()
+        self.parse_file_name = None
         self.parse_content = None
 
+        self.fetch_worker = None
+        self.fetch_cache = FetchCache(FETCH_CACHE_DIR, FETCH_CACHE_MAX_SIZE)
+
+        # Хеш текста, по которому построен индекс парсера
+        self.text_hash = None
+
         self.update_header_tree_and_window_title()
 
         self.read_settings()
 
-    def refresh_by_url(self):
+    def get_source(self):
+        """Функция возвращает ссылку и путь к файлу, из которых нужно загрузить текст."""
+
         logger.debug(
             f"TEST_USING_FILE_GAMES = {self.TEST_USING_FILE_GAMES.isChecked()}."
         )
 
+        # Локальные файлы не читаются в память, а разбираются напрямую из файла
+        url = None
+        content_file_name = None
+
         if self.TEST_USING_FILE_GAMES.isChecked():
             # TODO: для тестирования интерфейса
-            test_file_name = "gistfile1.txt"
-
-            logger.debug(f"Open and read {test_file_name} start.")
-            with open(test_file_name, "r", encoding="utf8") as f:
-                content_file = f.read()
-            logger.debug(
-                f"Finish open and read. Content file length = {len(content_file)}."
-            )
+            content_file_name = "gistfile1.txt"
+            logger.debug(f"Using file {content_file_name}.")
         else:
             url = self.line_edit_url.text()
 
             # Проверяем, что если прописан путь до файла на компе, то его открываем, иначе считаем ссылкой и качаем
             if os.path.exists(url):
-                with open(url, encoding="utf-8") as f:
-                    content_file = f.read()
+                content_file_name = url
 
-            else:
-                # Теперь нужно получить url файла с последней ревизией
-                logger.debug("Get url file last revision start.")
-                t = time.perf_counter()
+        return url, content_file_name
 
-                try:
-                    with urlopen(url) as f:
-                        context = f.read().decode()
+    def load_snapshot(self):
+        """Функция сразу показывает результат последнего разбора из снимка.
+        Актуальность снимка проверяется уже при загрузке текста в refresh_by_url.
 
-                        parser = etree.HTMLParser()
-                        tree = etree.parse(StringIO(context), parser)
+        """
 
-                        # Ищем первый файл с кнопкой Raw
-                        rel_url = tree.xpath(
-                            '//*[contains(@class, "file-actions")]/a/@href'
-                        )[0]
-                        logger.debug(f"Relative url = {rel_url}.")
+        url, content_file_name = self.get_source()
+        file_name = get_snapshot_file_name(get_source_name(url, content_file_name))
 
-                        url = urljoin(url, str(rel_url))
-                        logger.debug(f"Full url = {url}.")
+        result = load_snapshot(file_name, self.PARSE_GAME_NAME_ON_SEQUENCE.isChecked())
+        if result is None:
+            logger.debug("Snapshot not found.")
+            return
 
-                    logger.debug(
-                        f"Get url file last revision finish. Elapsed time: {time.perf_counter() - t:.3f} sec."
-                    )
+        logger.debug(f"Load snapshot {file_name}.")
+
+        self.text_hash, index = result
+        self.parser.set_index(index)
+        self.load_tree()
+
+    def refresh_by_url(self):
+        if self.fetch_worker is not None:
+            return
+
+        url, content_file_name = self.get_source()
+
+        parse_game_name_on_sequence = self.PARSE_GAME_NAME_ON_SEQUENCE.isChecked()
+
+        is_actual_index = (
+            self.parser.index is not None
+            and self.parser.index.parse_game_name_on_sequence
+            == parse_game_name_on_sequence
+        )
+
+        # После обновления по ссылке заново разбираются только изменившиеся платформы
+        index = None
+        if not content_file_name and is_actual_index:
+            index = self.parser.index.copy()
+
+        # Загрузка и разбор выполняются в отдельном потоке
+        self.fetch_worker = FetchWorker(
+            url,
+            content_file_name,
+            index,
+            parse_game_name_on_sequence,
+            self.fetch_cache,
+            self.text_hash if is_actual_index else None,
+            self,
+        )
+        self.fetch_worker.progress.connect(self._on_fetch_progress)
+        self.fetch_worker.result_ready.connect(self._on_fetch_result_ready)
+        self.fetch_worker.error.connect(self._on_fetch_error)
+        self.fetch_worker.finished.connect(self._on_fetch_finished)
+
+        self._set_fetching(True)
+        self.fetch_worker.start()
+
+    def cancel_refresh(self):
+        if self.fetch_worker is not None:
+            self.fetch_worker.cancel()
 
-                    with urlopen(url) as f:
-                        content_file = f.read().decode()
+    def _set_fetching(self, fetching):
+        self.button_refresh_by_url.setEnabled(not fetching)
+        self.button_cancel_fetch.setVisible(fetching)
 
-                except Exception as e:
-                    text = "".join(traceback.format_exc())
+        self.progress_bar_fetch.setVisible(fetching)
+        # Пока размер неизвестен, индикатор показывает просто процесс загрузки
+        self.progress_bar_fetch.setRange(0, 0)
 
-                    logger.error(text)
-                    QMessageBox.critical(None, "Error", text)
+    def _on_fetch_progress(self, stage, done, total):
+        if not total:
+            self.progress_bar_fetch.setRange(0, 0)
+            return
 
-                    content_file = ""
+        self.progress_bar_fetch.setRange(0, total)
+        self.progress_bar_fetch.setValue(done)
+        self.progress_bar_fetch.setFormat(f"{stage}: %p%")
 
+    def _on_fetch_result_ready(self, file_name, content, index, text_hash):
         logger.debug("Read last content finish.")
 
-        self.parse_content = content_file
+        self.parse_file_name = file_name
+        self.parse_content = content
+
+        # Текст не поменялся, уже показанный результат актуален
+        if index is None:
+            return
+
+        # Текст разбирается один раз, а фильтрация выполняется уже по индексу
+        self.text_hash = text_hash
+        self.parser.set_index(index)
         self.load_tree()
 
+    def _on_fetch_error(self, text):
+        QMessageBox.critical(self, "Error", text)
+
+    def _on_fetch_finished(self):
+        self.fetch_worker.deleteLater()
+        self.fetch_worker = None
+
+        self._set_fetching(False)
+
+    def build_index(self):
+        parse_game_name_on_sequence = self.PARSE_GAME_NAME_ON_SEQUENCE.isChecked()
+
+        # Показан результат из снимка, а текст еще не загружен
+        if not self.parse_file_name and self.parse_content is None:
+            return
+
+        if self.parse_file_name:
+            self.parser.build_index_from_file(
+                self.parse_file_name, parse_game_name_on_sequence
+            )
+        else:
+            # После обновления по ссылке заново разбираются только изменившиеся платформы
+            self.parser.build_index(
+                self.parse_content, parse_game_name_on_sequence, incremental=True
+            )
+
     def load_tree(self):
         logger.debug("Start build tree.")
 
@@ -274,59 +904,101 @@ class MainWindow(QMainWindow):
         if self.check_OTHER.isChecked():
             show_only_categories.append(Parser.CategoryEnum.OTHER)
 
-        self.parser.parse(
-            self.parse_content,
+        # Индекс нужно перестроить, если поменялся способ разбора названий игр
+        if (
+            self.parser.index is None
+            or self.parser.index.parse_game_name_on_sequence
+            != self.PARSE_GAME_NAME_ON_SEQUENCE.isChecked()
+        ):
+            self.build_index()
+
+        # Текст еще загружается
+        if self.parser.index is None:
+            return
+
+        self.parser.apply_filter(
             self.line_edit_filter.text(),
-            self.PARSE_GAME_NAME_ON_SEQUENCE.isChecked(),
             self.SORT_GAME.isChecked(),
             self.SORT_REVERSE.isChecked(),
             show_only_categories,
         )
-        self.tree_games.clear()
+        self.tree_model.set_parser(self.parser)
 
-        for k, v in self.parser.sorted_platforms:
-            platform_item = add_tree_widget_item_platform(v)
-            self.tree_games.addTopLevelItem(platform_item)
+        self.fetch_visible_games()
+        self.update_header_tree_and_window_title()
 
-            for kind in SEQ_ADDED_CATEGORIES:
-                if kind not in v.categories:
-                    continue
+    def _expand_inserted(self, parent, first, last):
+        # Игры добавятся в дерево при раскрытии их категории
+        for row in range(first, last + 1):
+            index = self.tree_model.index(row, 0, parent)
+            node = self.tree_model.get_node(index)
+            if node is None:
+                continue
 
-                category = v.categories[kind]
-                category_item = add_tree_widget_item_category(category)
-                platform_item.addChild(category_item)
+            self.tree_games.expand(index)
+            for child_row in range(len(node.children)):
+                self.tree_games.expand(self.tree_model.index(child_row, 0, index))
 
-                for game in category:
-                    game_item = add_tree_widget_item_game(game)
-                    category_item.addChild(game_item)
+    def fetch_visible_games(self, *args):
+        """Функция догружает игры категорий, последняя загруженная строка которых видна."""
 
-        if self.parser.other.count_games > 0:
-            other_item = QTreeWidgetItem(
-                [f"{OTHER_GAME_TITLE} ({self.parser.other.count_games}):"]
-            )
-            self.tree_games.addTopLevelItem(other_item)
+        viewport_height = self.tree_games.viewport().height()
 
-            for k, v in self.parser.other.platforms.items():
-                platform_item = add_tree_widget_item_platform(v)
-                other_item.addChild(platform_item)
+        index = self.tree_games.indexAt(QPoint(0, 0))
+        while index.isValid():
+            if self.tree_games.visualRect(index).top() > viewport_height:
+                break
 
-                for category in v.categories.values():
-                    for game in category:
-                        game_item = add_tree_widget_item_game(game)
-                        platform_item.addChild(game_item)
+            parent = index.parent()
+            if (
+                index.row() == self.tree_model.rowCount(parent) - 1
+                and self.tree_model.canFetchMore(parent)
+            ):
+                self.tree_model.fetchMore(parent)
 
-        self.tree_games.expandAll()
-        self.update_header_tree_and_window_title()
+            index = self.tree_games.indexBelow(index)
+
+    def set_profiling(self, enabled):
+        self.parser.stats = ParseStats(hook=self._on_parse_stats) if enabled else None
+
+    def _on_parse_stats(self, operation, stats):
+        logger.debug(f"Profile after {operation}:\n{stats.report()}")
+
+    def show_profile(self):
+        """Функция показывает время этапов разбора, накопленное с включения замеров."""
+
+        if self.parser.stats is None:
+            text = "Profiling is disabled. Enable PROFILE_PARSER in settings."
+        else:
+            # Моноширинный шрифт, чтобы столбцы таблицы были ровными
+            text = f"<pre>{self.parser.stats.report()}</pre>"
+
+        QMessageBox.information(self, "Profile", text)
 
     def update_header_tree_and_window_title(self):
         # Указываем в заголовке общее количество игр и при фильтр, количество игр, оставшихся после фильтрации
-        self.tree_games.setHeaderLabel(f"{TREE_HEADER} ({self.parser.count_games})")
+        self.tree_model.set_header(f"{TREE_HEADER} ({self.parser.count_games})")
 
         # Обновление заголовка окна
         self.setWindowTitle(
             f"{WINDOW_TITLE}. Platforms: {self.parser.count_platforms}. Games: {self.parser.count_games}"
         )
 
+        # Сводка замечаний к тексту, текст самих замечаний нужен только для подсказки
+        diagnostics = self.parser.diagnostics
+        if diagnostics:
+            self.statusBar().showMessage(
+                f"Warnings ({diagnostics.total}): {diagnostics.summary()}"
+            )
+            self.statusBar().setToolTip(
+                "\n".join(
+                    str(d) for d in diagnostics.records[:DIAGNOSTICS_TOOLTIP_SIZE]
+                )
+            )
+        else:
+            self.statusBar().clearMessage()
+            self.statusBar().setToolTip("")
+
     def read_settings(self):
         logger.debug(f"Start read_settings. CONFIG_FILE={CONFIG_FILE}.")
 
@@ -405,6 +1077,10 @@ class MainWindow(QMainWindow):
         logger.debug("Finish write_settings.")
 
     def closeEvent(self, event):
+        if self.fetch_worker is not None:
+            self.fetch_worker.cancel()
+            self.fetch_worker.wait()
+
         self.write_settings()
         quit()
 
@@ -414,6 +1090,9 @@ if __name__ == "__main__":
 
     mw = MainWindow()
     mw.show()
+
+    # Сначала показывается результат прошлого запуска, а затем он обновляется
+    mw.load_snapshot()
     mw.refresh_by_url()
 
     sys.exit(app.exec_())
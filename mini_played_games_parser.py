@@ -6,6 +6,32 @@ __author__ = "ipetrash"
 
 import re
 
+from functools import lru_cache
+from typing import Iterable, Sequence
+
+from played_games_stream import (
+    CATEGORY_BY_ATTRIBUTES,
+    MAX_GAME_NAME_SEQUENCE_SIZE,
+    CategoryEnum,
+    Diagnostic,
+    DiagnosticEvent,
+    DiagnosticKind,
+    Diagnostics,
+    GameEvent,
+    GameNameSequence,
+    LinePrefix,
+    LinePrefixTable,
+    OTHER_LINE_BOUNDARY_PATTERN,
+    PlatformEvent,
+    get_line_prefix,
+    iter_lines,
+    iter_parse_events,
+    iter_parse_events_from_file,
+    iter_platform_chunks,
+    iter_splitlines,
+    parse_chunks,
+)
+
 
 # Регулярка вытаскивает выражения вида: 1, 2, 3 или 1-3, или римские цифры: III, IV
 PARSE_GAME_NAME_PATTERN = re.compile(
@@ -13,22 +39,40 @@ PARSE_GAME_NAME_PATTERN = re.compile(
     flags=re.IGNORECASE,
 )
 
+# Количество названий игр с частями, результат разбора которых хранится в кэше
+PARSE_GAME_NAME_CACHE_SIZE = 4096
+
 FINISHED_GAME = "FINISHED_GAME"
 NOT_FINISHED_GAME = "NOT_FINISHED_GAME"
 FINISHED_WATCHED = "FINISHED_WATCHED"
 NOT_FINISHED_WATCHED = "NOT_FINISHED_WATCHED"
 
+# Атрибуты игры и названия категорий. Строки разбираются по таблице LINE_PREFIXES,
+# а этот словарь оставлен для совместимости
 FLAG_BY_CATEGORY: dict[str, str] = {
-    "  ": FINISHED_GAME,
-    "- ": NOT_FINISHED_GAME,
-    " -": NOT_FINISHED_GAME,
-    " @": FINISHED_WATCHED,
-    "@ ": FINISHED_WATCHED,
-    "-@": NOT_FINISHED_WATCHED,
-    "@-": NOT_FINISHED_WATCHED,
+    attributes: category.name
+    for attributes, category in CATEGORY_BY_ATTRIBUTES.items()
 }
 
 
+def _classify_line_prefix(prefix: str) -> LinePrefix:
+    # В отличие от played_games_parser, заголовком платформы считается любая строка
+    # с двоеточием на конце, если ее первые символы не атрибуты известной игры.
+    # Например, "X-Box:" или "@@Foo:"
+    line_prefix = get_line_prefix(prefix)
+    return line_prefix._replace(may_be_platform=line_prefix.diagnostic_kind is not None)
+
+
+# Таблица разбора строк этого парсера
+LINE_PREFIXES = LinePrefixTable(_classify_line_prefix)
+
+# Строка заголовка платформы, аналогично правилу таблицы LINE_PREFIXES
+PLATFORM_LINE_PATTERN = re.compile(
+    r"^(?!%s).*:[^\S\n]*$" % "|".join(map(re.escape, CATEGORY_BY_ATTRIBUTES)),
+    flags=re.MULTILINE,
+)
+
+
 def parse_game_name(game_name: str) -> list[str]:
     """
     Функция принимает название игры и пытается разобрать его, после возвращает список названий.
@@ -42,9 +86,30 @@ def parse_game_name(game_name: str) -> list[str]:
 
     """
 
+    return list(parse_game_name_sequence(game_name))
+
+
+def parse_game_name_sequence(game_name: str) -> Sequence[str]:
+    """
+    Функция аналогична parse_game_name, но части возвращаются в GameNameSequence,
+    названия которой создаются только при переборе. Результат неизменяемый.
+
+    """
+
+    # Части перечисляются через запятую или задаются диапазоном через дефис,
+    # поэтому в названиях без этих символов регулярка ничего не найдет
+    if "," not in game_name and "-" not in game_name:
+        return [game_name]
+
+    # Результат в кэше общий для всех вызовов, но он неизменяемый
+    return _parse_game_name_cached(game_name)
+
+
+@lru_cache(maxsize=PARSE_GAME_NAME_CACHE_SIZE)
+def _parse_game_name_cached(game_name: str) -> Sequence[str]:
     match = PARSE_GAME_NAME_PATTERN.search(game_name)
     if not match:
-        return [game_name]
+        return (game_name,)
 
     seq_str = match.group(0)
 
@@ -65,91 +130,286 @@ def parse_game_name(game_name: str) -> list[str]:
         # ['1', '7'] -> [1, 7]
         seq = list(map(int, seq))
 
-        # [1, 7] -> ['1', '2', '3', '4', '5', '6', '7']
-        seq = list(map(str, range(seq[0], seq[1] + 1)))
+        # [1, 7] -> range(1, 8)
+        seq = range(seq[0], seq[1] + 1)
 
     else:
-        return [game_name]
+        return (game_name,)
+
+    return GameNameSequence(base_name, seq)
+
+
+def format_error(diagnostic: Diagnostic) -> str:
+    """Функция возвращает текст ошибки разбора в формате этого парсера."""
+
+    if diagnostic.kind == DiagnosticKind.DUPLICATE_GAME:
+        return f'Предотвращено добавление дубликата игры "{diagnostic.game}"'
+
+    if diagnostic.kind in (
+        DiagnosticKind.CONFLICTING_CATEGORIES,
+        DiagnosticKind.SEQUENCE_TOO_LONG,
+    ):
+        return str(diagnostic)
 
-    # Сразу проверяем номер игры в серии и если она первая, то не добавляем в названии ее номер
-    return [base_name if num == "1" else f"{base_name} {num}" for num in seq]
+    return f"Странный формат строки: {diagnostic.game!r}"
 
 
 def parse_played_games(
-    text: str,
+    text: str | Iterable[str],
     silence: bool = False,
     errors: list[str] | None = None,
+    parallel: bool = False,
+    diagnostics: Diagnostics | None = None,
 ) -> dict[str, dict[str, list[str]]]:
     """
     Функция для парсинга списка игр.
 
+    Вместо строки можно передать итерируемый объект строк, например, открытый файл.
+
+    При parallel=True разделы платформ большого текста разбираются в пуле процессов,
+    результат и ошибки будут такими же, как при обычном разборе.
+
+    Ошибки разбора собираются в diagnostics. Текст ошибок формируется, только если
+    их нужно напечатать (silence=False) или добавить в errors. Если diagnostics передан
+    и хранит ограниченное число записей, то в errors попадут только сохраненные записи.
+
     """
 
-    if errors is None:
-        errors = []
+    if diagnostics is None:
+        diagnostics = _create_diagnostics(silence, errors)
+
+    start = len(diagnostics.records)
+
+    # Куски текста для пула делятся только по "\n", поэтому текст с другими
+    # границами строк разбирается обычным способом
+    if (
+        parallel
+        and isinstance(text, str)
+        and not OTHER_LINE_BOUNDARY_PATTERN.search(text)
+    ):
+        platforms = _parse_played_games_parallel(text, diagnostics)
+    else:
+        # Строки делятся так же, как в str.splitlines
+        lines = iter_splitlines(text) if isinstance(text, str) else text
+        events = iter_parse_events(lines, line_prefixes=LINE_PREFIXES)
+        platforms = _parse_played_games_events(events, diagnostics)
+
+    _report_errors(diagnostics.records[start:], silence, errors)
+
+    return platforms
+
+
+def parse_played_games_file(
+    file_name: str,
+    silence: bool = False,
+    errors: list[str] | None = None,
+    encoding: str = "utf-8",
+    diagnostics: Diagnostics | None = None,
+) -> dict[str, dict[str, list[str]]]:
+    """
+    Функция аналогична parse_played_games, но разбирает локальный файл без чтения его в память.
+    Строки файла делятся по "\n" (и "\r\n").
+
+    """
+
+    if diagnostics is None:
+        diagnostics = _create_diagnostics(silence, errors)
+
+    start = len(diagnostics.records)
+
+    events = iter_parse_events_from_file(file_name, encoding, LINE_PREFIXES)
+    platforms = _parse_played_games_events(events, diagnostics)
+
+    _report_errors(diagnostics.records[start:], silence, errors)
+
+    return platforms
+
+
+def _create_diagnostics(silence: bool, errors: list[str] | None) -> Diagnostics:
+    # Если ошибки не печатаются и не возвращаются, то достаточно их посчитать
+    if silence and errors is None:
+        return Diagnostics(max_examples=0)
+
+    return Diagnostics(max_examples=None)
+
+
+def _report_errors(
+    records: list[Diagnostic],
+    silence: bool,
+    errors: list[str] | None,
+):
+    if silence and errors is None:
+        return
+
+    for diagnostic in records:
+        error_text = format_error(diagnostic)
+        if errors is not None:
+            errors.append(error_text)
 
-    def _process_error(error_text: str):
-        errors.append(error_text)
         if not silence:
             print(error_text)
 
+
+def _parse_played_games_events(
+    events: Iterable[PlatformEvent | GameEvent | DiagnosticEvent],
+    diagnostics: Diagnostics,
+) -> dict[str, dict[str, list[str]]]:
+    platforms, games_by_platform = _build_platforms(events, diagnostics)
+    _check_conflicts(platforms, games_by_platform, diagnostics)
+
+    return platforms
+
+
+def _parse_played_games_chunks(
+    chunks: list[tuple[str, int]],
+    max_examples: int | None = None,
+) -> list[tuple[dict[str, dict[str, list[str]]], Diagnostics]]:
+    """
+    Функция разбирает куски текста из iter_platform_chunks, возвращая по каждому куску
+    платформы и ошибки. Вызывается в процессах пула, поэтому ничего не печатает.
+
+    """
+
+    results = []
+    for chunk, line_number in chunks:
+        diagnostics = Diagnostics(max_examples)
+        events = iter_parse_events(iter_lines(chunk), line_number, LINE_PREFIXES)
+        platforms, _ = _build_platforms(events, diagnostics)
+        results.append((platforms, diagnostics))
+
+    return results
+
+
+def _parse_played_games_parallel(
+    text: str,
+    diagnostics: Diagnostics,
+) -> dict[str, dict[str, list[str]]]:
+    chunks = list(iter_platform_chunks(text, PLATFORM_LINE_PATTERN))
+
     platforms: dict[str, dict[str, list[str]]] = dict()
-    platform = None
+    for chunk_platforms, chunk_diagnostics in parse_chunks(
+        _parse_played_games_chunks, chunks, diagnostics.max_examples
+    ):
+        diagnostics.merge(chunk_diagnostics)
+
+        # Платформа с уже встречавшимся именем заменяет прошлую, как и при обычном разборе
+        platforms.update(chunk_platforms)
+
+    games_by_platform = {
+        platform: {
+            category_name: set(games) for category_name, games in categories.items()
+        }
+        for platform, categories in platforms.items()
+    }
+    _check_conflicts(platforms, games_by_platform, diagnostics)
 
-    for line in text.splitlines():
-        line = line.rstrip()
-        if not line:
-            continue
+    return platforms
 
-        flag = line[:2]
-        if flag not in FLAG_BY_CATEGORY and line.endswith(":"):
-            platform_name = line[:-1]
 
+def _build_platforms(
+    events: Iterable[PlatformEvent | GameEvent | DiagnosticEvent],
+    diagnostics: Diagnostics,
+) -> tuple[dict[str, dict[str, list[str]]], dict[str, dict[str, set[str]]]]:
+    platforms: dict[str, dict[str, list[str]]] = dict()
+    platform = None
+
+    # Множества игр по категориям платформ, нужны для быстрой проверки наличия игры
+    games_by_platform: dict[str, dict[str, set[str]]] = dict()
+    games_by_category = None
+
+    for event in events:
+        if type(event) is PlatformEvent:
             platform = {
                 FINISHED_GAME: [],
                 NOT_FINISHED_GAME: [],
                 FINISHED_WATCHED: [],
                 NOT_FINISHED_WATCHED: [],
             }
-            platforms[platform_name] = platform
+            platforms[event.name] = platform
+
+            games_by_category = {category_name: set() for category_name in platform}
+            games_by_platform[event.name] = games_by_category
 
             continue
 
-        if not platform:
+        if type(event) is DiagnosticEvent:
+            diagnostics.add(
+                Diagnostic(event.kind, event.platform, event.line, event.line_number)
+            )
             continue
 
-        category_name = FLAG_BY_CATEGORY.get(flag)
-        if not category_name:
-            _process_error(f"Странный формат строки: {line!r}")
+        # Строки странного формата уже попали в ошибки
+        if event.category == CategoryEnum.OTHER:
             continue
 
+        category_name = event.category.name
         category = platform[category_name]
-
-        game_name = line[2:]
-        for game in parse_game_name(game_name):
-            if game in category:
-                _process_error(f'Предотвращено добавление дубликата игры "{game}"')
+        category_games = games_by_category[category_name]
+
+        games = parse_game_name_sequence(event.name)
+        if len(games) > MAX_GAME_NAME_SEQUENCE_SIZE:
+            diagnostics.add(
+                Diagnostic(
+                    DiagnosticKind.SEQUENCE_TOO_LONG,
+                    event.platform,
+                    event.name,
+                    event.line_number,
+                    event.category,
+                )
+            )
+            games = [event.name]
+
+        for game in games:
+            if game in category_games:
+                diagnostics.add(
+                    Diagnostic(
+                        DiagnosticKind.DUPLICATE_GAME,
+                        event.platform,
+                        game,
+                        event.line_number,
+                        event.category,
+                    )
+                )
                 continue
 
             category.append(game)
+            category_games.add(game)
 
+    return platforms, games_by_platform
+
+
+def _check_conflicts(
+    platforms: dict[str, dict[str, list[str]]],
+    games_by_platform: dict[str, dict[str, set[str]]],
+    diagnostics: Diagnostics,
+):
     # Проверка, что одна и та же игра не присутствует и в пройденных, и в не пройденных,
     # или в просмотренных и в не просмотренных
     for platform, categories in platforms.items():
+        games_by_category = games_by_platform[platform]
+
         for game in categories[NOT_FINISHED_GAME]:
-            if game in categories[FINISHED_GAME]:
-                _process_error(
-                    f'Игра "{game}" ({platform}) присутствует и в не пройденных, и в пройденных'
+            if game in games_by_category[FINISHED_GAME]:
+                diagnostics.add(
+                    Diagnostic(
+                        DiagnosticKind.CONFLICTING_CATEGORIES,
+                        platform,
+                        game,
+                        category=CategoryEnum.NOT_FINISHED_GAME,
+                    )
                 )
 
         for game in categories[NOT_FINISHED_WATCHED]:
-            if game in categories[FINISHED_WATCHED]:
-                _process_error(
-                    f'Игра "{game}" ({platform}) присутствует и в не просмотренных, и в просмотренных'
+            if game in games_by_category[FINISHED_WATCHED]:
+                diagnostics.add(
+                    Diagnostic(
+                        DiagnosticKind.CONFLICTING_CATEGORIES,
+                        platform,
+                        game,
+                        category=CategoryEnum.NOT_FINISHED_WATCHED,
+                    )
                 )
 
-    return platforms
-
 
 if __name__ == "__main__":
     print("Tests")
@@ -177,6 +437,62 @@ PC:
         'Игра "Bar 2" (PC) присутствует и в не просмотренных, и в просмотренных',
     ]
 
+    # Ошибки собираются в diagnostics, даже если их текст не нужен
+    diagnostics = Diagnostics(max_examples=1)
+    assert parse_played_games(text, silence=True, diagnostics=diagnostics) == platforms
+    assert diagnostics.total == 4
+    assert diagnostics.counts[DiagnosticKind.CONFLICTING_CATEGORIES] == 2
+    assert [format_error(d) for d in diagnostics] == errors[:3]
+    assert diagnostics.records[1].line_number == 5
+
+    # Разбор по строкам дает тот же результат, что и разбор всего текста
+    assert parse_played_games(text.splitlines(keepends=True), silence=True) == platforms
+
+    # Строки делятся так же, как в str.splitlines, в том числе с "\r\n" и "\r"
+    for line_break in ["\r\n", "\r", "\x0c", "\u2028"]:
+        text_with_breaks = text.replace("\n", line_break)
+        for parallel in [False, True]:
+            errors = []
+            assert (
+                parse_played_games(
+                    text_with_breaks, silence=True, errors=errors, parallel=parallel
+                )
+                == platforms
+            )
+            assert len(errors) == 4
+            assert errors[0] == "Странный формат строки: '? Bar'"
+
+    assert list(iter_splitlines("a\rb\r\nc\x0b\u2028d\r")) == ["a", "b", "c", "", "d"]
+
+    # Диапазон с опечаткой не разворачивается в миллион игр
+    errors = []
+    platforms = parse_played_games("PC:\n  Foo 1-999999", silence=True, errors=errors)
+    assert platforms["PC"]["FINISHED_GAME"] == ["Foo 1-999999"]
+    assert len(errors) == 1 and "Foo 1-999999" in errors[0]
+
+    # Заголовок платформы -- любая строка с двоеточием на конце, кроме строк игр
+    text = "X-Box:\n  Foo\n@@Bar:\n- Bar\n  Baz:\n?? Qux:"
+    for parallel in [False, True]:
+        errors = []
+        platforms = parse_played_games(
+            text, silence=True, errors=errors, parallel=parallel
+        )
+        assert list(platforms) == ["X-Box", "@@Bar", "?? Qux"]
+        assert platforms["X-Box"]["FINISHED_GAME"] == ["Foo"]
+        assert platforms["@@Bar"]["NOT_FINISHED_GAME"] == ["Bar"]
+        assert platforms["@@Bar"]["FINISHED_GAME"] == ["Baz:"]
+        assert errors == []
+
+    # Публичная функция возвращает новый список, а части разворачиваются лениво
+    # только в parse_game_name_sequence
+    assert parse_game_name("Foo 1-3") == ["Foo", "Foo 2", "Foo 3"]
+    assert parse_game_name("Foo") == ["Foo"]
+    games = parse_game_name("Foo 1, 2")
+    games.append("Bar")
+    assert parse_game_name("Foo 1, 2") == ["Foo", "Foo 2"]
+    assert list(parse_game_name_sequence("Foo 1-3")) == ["Foo", "Foo 2", "Foo 3"]
+    assert len(parse_game_name_sequence("Foo 1-999999")) == 999999
+
     print("\n" + "-" * 100 + "\n")
 
     def print_text(text, export_to_file_name):
@@ -211,25 +527,22 @@ PC:
     text = get_text_from_local()
     print_text(text, "games_local.json")
 
+    assert parse_played_games_file("gistfile1.txt", silence=True) == parse_played_games(
+        text, silence=True
+    )
+
     print("\n" + "-" * 100 + "\n")
 
     print("get_text_from_url")
 
-    from urllib.parse import urljoin
-    import requests
+    from played_games_fetch import FetchCache, fetch_gist_text
+
+    # Тот же кэш, что и у gui.py: повторная загрузка без изменений не скачивает файл
+    fetch_cache = FetchCache()
 
     def get_text_from_url() -> str:
         url_gist = "https://gist.github.com/gil9red/2f80a34fb601cd685353"
-        rs = requests.get(url_gist)
-
-        match = re.search("/gil9red/2f80a34fb601cd685353/raw/.+/gistfile1.txt", rs.text)
-        if not match:
-            return ""
-
-        url = urljoin(rs.url, match.group())
-
-        rs = requests.get(url)
-        return rs.text
+        return fetch_gist_text(url_gist, cache=fetch_cache)
 
     def get_played_games() -> dict[str, dict[str, list[str]]]:
         text = get_text_from_url()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Колоночное хранилище результата разбора.
+
+Вместо объектов Parser.Game игры хранятся столбцами: список названий и компактные массивы
+идентификаторов платформ и значений CategoryEnum. Строки сгруппированы по платформе
+и категории, поэтому игры одной категории платформы идут подряд, а количество игр,
+сортировка платформ и фильтр по категориям считаются по столбцам целиком.
+Классы *View повторяют интерфейс Parser.Platform, Parser.Category и Parser.Game.
+
+"""
+
+__author__ = "ipetrash"
+
+
+from array import array
+from collections import Counter
+from itertools import accumulate, compress, repeat
+from operator import add, attrgetter, is_, mul
+from typing import Iterable, Iterator, NamedTuple
+
+from played_games_stream import DEFAULT_FILTER_IGNORE_CASE, CategoryEnum
+
+
+# Категории по их значению
+CATEGORIES: list[CategoryEnum] = sorted(CategoryEnum, key=attrgetter("value"))
+NUMBER_CATEGORIES = len(CATEGORIES)
+
+
+class GameView(NamedTuple):
+    name: str
+    category: "CategoryView"
+
+    @property
+    def category_kind(self) -> CategoryEnum:
+        return self.category.kind
+
+
+class CategoryView:
+    """Категория платформы -- срез строк хранилища."""
+
+    __slots__ = ("platform", "kind", "start", "stop")
+
+    def __init__(
+        self, platform: "PlatformView", kind: CategoryEnum, start: int, stop: int
+    ):
+        self.platform = platform
+        self.kind = kind
+        self.start = start
+        self.stop = stop
+
+    @property
+    def names(self) -> list[str]:
+        return self.platform.result.names[self.start : self.stop]
+
+    @property
+    def game_list(self) -> list[GameView]:
+        return list(self)
+
+    @property
+    def count(self) -> int:
+        return self.stop - self.start
+
+    def __iter__(self) -> Iterator[GameView]:
+        return map(GameView, self.names, repeat(self))
+
+    def __str__(self):
+        return f"Category {self.kind} ({self.count})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class PlatformView:
+    """Платформа хранилища. Содержит категории в порядке их значений."""
+
+    __slots__ = ("result", "platform_id", "categories")
+
+    def __init__(self, result: "ColumnarResult", platform_id: int):
+        self.result = result
+        self.platform_id = platform_id
+        self.categories: dict[CategoryEnum, CategoryView] = dict()
+
+    @property
+    def name(self) -> str:
+        return self.result.platform_names[self.platform_id]
+
+    @property
+    def count_games(self) -> int:
+        return sum(category.count for category in self.categories.values())
+
+    @property
+    def count_categories(self) -> int:
+        return len(self.categories)
+
+    def __str__(self):
+        return f"Platform {self.name}. Games: {self.count_games}. Categories: {self.count_categories}."
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class OtherView:
+    """Неопределенные игры хранилища."""
+
+    def __init__(self, platforms: dict[str, PlatformView]):
+        self.platforms = platforms
+
+    @property
+    def count_games(self) -> int:
+        return sum(p.count_games for p in self.platforms.values())
+
+    @property
+    def count_platforms(self) -> int:
+        return len(self.platforms)
+
+
+class ColumnarResult:
+    """Колоночное хранилище результата разбора.
+
+    Столбцы:
+        names -- названия игр
+        platform_ids -- индекс платформы в platform_names
+        category_values -- значение CategoryEnum
+
+    Кроме столбцов хранится порядок платформ неопределенных игр: в Parser.Other они
+    идут в порядке появления первой неопределенной игры.
+
+    """
+
+    def __init__(
+        self,
+        platform_names: Iterable[str] = (),
+        names: Iterable[str] = (),
+        platform_ids: Iterable[int] = (),
+        category_values: Iterable[int] = (),
+        other_platform_names: Iterable[str] = (),
+    ):
+        self.platform_names = list(platform_names)
+        self.other_platform_names = list(other_platform_names)
+        self.names = list(names)
+        self.platform_ids = array("I", platform_ids)
+        self.category_values = array("B", category_values)
+
+        self._group_counts = None
+        self._platforms = None
+        self._other = None
+
+    @classmethod
+    def from_entries(cls, entries, platform_names) -> "ColumnarResult":
+        """Создание хранилища из записей Parser.Index."""
+
+        platform_names = list(platform_names)
+        if not entries:
+            return cls(platform_names)
+
+        platforms, kinds, _, names = zip(*entries)
+
+        # Неопределенные игры могут повторяться, например, строка с неизвестными
+        # атрибутами попадает в индекс для каждой части названия
+        rows = dict.fromkeys(zip(platforms, kinds, names))
+        platforms, kinds, names = zip(*rows)
+
+        other_platform_names = dict.fromkeys(
+            compress(platforms, map(is_, kinds, repeat(CategoryEnum.OTHER)))
+        )
+
+        platform_id_by_name = {name: i for i, name in enumerate(platform_names)}
+        platform_ids = array("I", map(platform_id_by_name.__getitem__, platforms))
+        category_values = array("B", map(attrgetter("value"), kinds))
+
+        # Группировка строк по платформе и категории, порядок внутри группы сохраняется
+        keys = list(
+            map(add, map(mul, platform_ids, repeat(NUMBER_CATEGORIES)), category_values)
+        )
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+
+        return cls(
+            platform_names,
+            map(names.__getitem__, order),
+            map(platform_ids.__getitem__, order),
+            map(category_values.__getitem__, order),
+            other_platform_names,
+        )
+
+    @classmethod
+    def from_index(
+        cls,
+        index,
+        filter_exp="",
+        sort_game=False,
+        sort_reverse=False,
+        show_only_categories=tuple(CategoryEnum),
+        filter_ignore_case=DEFAULT_FILTER_IGNORE_CASE,
+    ) -> "ColumnarResult":
+        """Аналог Parser.apply_filter, результат которого -- колоночное хранилище."""
+
+        result = cls.from_entries(
+            index.filter(filter_exp, filter_ignore_case, show_only_categories),
+            index.platform_names,
+        )
+        if sort_game:
+            result.sort_games(sort_reverse)
+
+        return result
+
+    def select_categories(self, show_only_categories) -> "ColumnarResult":
+        """Возвращает новое хранилище только с играми указанных категорий."""
+
+        allowed = bytearray(256)
+        for kind in show_only_categories:
+            allowed[kind.value] = 1
+
+        mask = bytes(map(allowed.__getitem__, self.category_values))
+        return ColumnarResult(
+            self.platform_names,
+            compress(self.names, mask),
+            compress(self.platform_ids, mask),
+            compress(self.category_values, mask),
+            self.other_platform_names,
+        )
+
+    def sort_games(self, reverse=False):
+        """Сортировка игр по названию внутри каждой категории платформы."""
+
+        start = 0
+        for stop in accumulate(self.group_counts.values()):
+            self.names[start:stop] = sorted(self.names[start:stop], reverse=reverse)
+            start = stop
+
+    @property
+    def group_counts(self) -> dict[tuple[int, int], int]:
+        """Количество игр по (индекс платформы, значение категории) в порядке строк."""
+
+        if self._group_counts is None:
+            self._group_counts = dict(
+                Counter(zip(self.platform_ids, self.category_values))
+            )
+
+        return self._group_counts
+
+    def _build_views(self):
+        platforms = dict()
+        other_platforms = dict()
+
+        start = 0
+        for (platform_id, category_value), count in self.group_counts.items():
+            kind = CATEGORIES[category_value]
+            target = other_platforms if kind == CategoryEnum.OTHER else platforms
+
+            platform = target.get(platform_id)
+            if platform is None:
+                platform = target[platform_id] = PlatformView(self, platform_id)
+
+            platform.categories[kind] = CategoryView(platform, kind, start, start + count)
+            start += count
+
+        # Платформы идут в порядке появления в тексте
+        self._platforms = {
+            self.platform_names[i]: platforms[i] for i in sorted(platforms)
+        }
+
+        other_platforms = {
+            self.platform_names[i]: platform for i, platform in other_platforms.items()
+        }
+        self._other = OtherView(
+            {
+                name: other_platforms[name]
+                for name in self.other_platform_names
+                if name in other_platforms
+            }
+        )
+
+    @property
+    def platforms(self) -> dict[str, PlatformView]:
+        if self._platforms is None:
+            self._build_views()
+
+        return self._platforms
+
+    @property
+    def other(self) -> OtherView:
+        if self._other is None:
+            self._build_views()
+
+        return self._other
+
+    @property
+    def count_games(self) -> int:
+        return len(self.names)
+
+    @property
+    def count_platforms(self) -> int:
+        return len(self.platforms)
+
+    def count_by_platform(self) -> dict[str, int]:
+        """Количество игр на платформах, без учета неопределенных игр."""
+
+        counts = Counter()
+        other_value = CategoryEnum.OTHER.value
+        for (platform_id, category_value), count in self.group_counts.items():
+            if category_value != other_value:
+                counts[platform_id] += count
+
+        return {self.platform_names[i]: count for i, count in counts.items()}
+
+    def count_by_category(self) -> dict[CategoryEnum, int]:
+        counts = Counter(self.category_values)
+        return {CATEGORIES[value]: count for value, count in counts.items()}
+
+    @property
+    def sorted_platforms(self, reverse=True) -> list[tuple[str, PlatformView]]:
+        """Аналог Parser.sorted_platforms."""
+
+        counts = self.count_by_platform()
+        return sorted(
+            self.platforms.items(), key=lambda x: counts[x[0]], reverse=reverse
+        )
+
+
+if __name__ == "__main__":
+    from played_games_parser import Parser, logger
+
+    logger.disabled = True
+
+    print("Tests")
+
+    def _dump(result):
+        return (
+            [
+                (k, [(kind, [g.name for g in c]) for kind, c in v.categories.items()])
+                for k, v in result.sorted_platforms
+            ],
+            [
+                (k, [g.name for c in v.categories.values() for g in c])
+                for k, v in result.other.platforms.items()
+            ],
+            result.count_games,
+            result.count_platforms,
+            result.other.count_games,
+        )
+
+    p = Parser()
+    p.build_index_from_file("gistfile1.txt")
+
+    for filter_exp in ("", "R", "*2"):
+        for sort_game, sort_reverse in ((False, False), (True, False), (True, True)):
+            for show_only_categories in (
+                tuple(CategoryEnum),
+                (CategoryEnum.OTHER, CategoryEnum.FINISHED_WATCHED),
+            ):
+                p.apply_filter(filter_exp, sort_game, sort_reverse, show_only_categories)
+                result = ColumnarResult.from_index(
+                    p.index, filter_exp, sort_game, sort_reverse, show_only_categories
+                )
+
+                expected = _dump(p)
+                # Категории в хранилище идут в порядке их значений
+                for _, categories in expected[0]:
+                    categories.sort(key=lambda x: x[0].value)
+
+                assert _dump(result) == expected
@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Загрузка списка игр из гиста.
+
+Сначала загружается страница гиста, в ней ищется ссылка Raw на файл последней ревизии,
+после чего загружается сам файл. Ссылка ищется по мере загрузки страницы, без построения
+DOM, и загрузка прекращается, как только ссылка найдена. Функции не зависят от Qt: загрузку можно отменить
+через is_cancelled, а о ходе загрузки сообщается через progress, поэтому они вызываются
+как из фонового потока интерфейса, так и напрямую.
+
+Ответы можно сохранять в FetchCache: при повторной загрузке сервер получает условный
+запрос (If-None-Match, If-Modified-Since) и, если ничего не поменялось, отвечает 304
+без тела. Для страницы гиста в кэше хранится только найденная ссылка на файл ревизии,
+а файл конкретной ревизии не меняется, поэтому он повторно не запрашивается.
+
+Модули для работы с сетью импортируются при первом запросе, поэтому импорт этого модуля
+не замедляет запуск, когда список игр берется из локального файла.
+
+"""
+
+__author__ = "ipetrash"
+
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from http.client import HTTPResponse
+
+
+# Максимальное время загрузки одного ответа в секундах
+DEFAULT_TIMEOUT = 30
+
+# Размер блока, которым читается ответ сервера
+BLOCK_SIZE = 64 * 1024
+
+# Этапы загрузки, передаются в progress
+STAGE_PAGE = "page"
+STAGE_RAW = "raw"
+
+CACHE_DIR = "fetch_cache"
+
+# Максимальный суммарный размер тел ответов в кэше
+CACHE_MAX_SIZE = 50 * 1024 * 1024
+
+# Ссылка на файл конкретной ревизии гиста: .../raw/<хеш ревизии>/<файл>
+REVISION_URL_PATTERN = re.compile(r"/raw/[0-9a-f]{40}/")
+
+# Первая ссылка внутри элемента с классом file-actions -- кнопка Raw первого файла
+RAW_LINK_PATTERN = re.compile(
+    rb'class="[^"]*\bfile-actions\b[^"]*"[^>]*>(?:(?!</div>).)*?<a\b[^>]*?\bhref="([^"]+)"',
+    flags=re.DOTALL,
+)
+
+# Сколько байт с конца прочитанной части страницы сохраняется для поиска ссылки,
+# которая оказалась на границе блоков
+RAW_LINK_MAX_LENGTH = 4096
+
+
+class FetchCancelled(Exception):
+    """Загрузка отменена через is_cancelled."""
+
+
+class FetchCache:
+    """Дисковый кэш ответов сервера по ссылке.
+
+    Для каждой ссылки хранятся два файла: <ключ>.body с телом ответа и <ключ>.json
+    с итоговой ссылкой, заголовками ETag и Last-Modified и найденной на странице
+    ссылкой на файл ревизии. Если суммарный размер тел превышает max_size, то удаляются
+    записи, которые дольше всего не использовались.
+
+    """
+
+    class Entry:
+        """Метаданные закэшированного ответа."""
+
+        def __init__(
+            self, url, final_url=None, etag=None, last_modified=None, raw_url=None
+        ):
+            self.url = url
+            self.final_url = final_url or url
+            self.etag = etag
+            self.last_modified = last_modified
+
+            # Ссылка на файл ревизии, найденная в этом ответе
+            self.raw_url = raw_url
+
+        def __str__(self):
+            return f"Entry {self.url} (etag={self.etag}, last_modified={self.last_modified})"
+
+        def __repr__(self):
+            return self.__str__()
+
+    def __init__(self, dir_name: str = CACHE_DIR, max_size: int = CACHE_MAX_SIZE):
+        self.dir_name = dir_name
+        self.max_size = max_size
+
+    def _get_path(self, url: str, ext: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.dir_name, key + ext)
+
+    def get(self, url: str) -> Entry | None:
+        """Функция возвращает метаданные ответа или None, если его нет в кэше."""
+
+        try:
+            with open(self._get_path(url, ".json"), encoding="utf-8") as f:
+                data = json.load(f)
+
+            if not os.path.exists(self._get_path(url, ".body")):
+                return None
+
+            return FetchCache.Entry(**data)
+
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def get_body(self, url: str) -> bytes:
+        path = self._get_path(url, ".body")
+        with open(path, "rb") as f:
+            body = f.read()
+
+        # Время изменения -- время последнего использования, по нему работает вытеснение
+        os.utime(path)
+
+        return body
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        final_url: str | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        raw_url: str | None = None,
+    ):
+        """Функция сохраняет ответ. Для страницы гиста тело не нужно, достаточно
+        найденной в нем ссылки на файл ревизии.
+
+        """
+
+        if len(body) > self.max_size:
+            return
+
+        os.makedirs(self.dir_name, exist_ok=True)
+
+        self._write(self._get_path(url, ".body"), body)
+        self._write_entry(
+            FetchCache.Entry(url, final_url, etag, last_modified, raw_url)
+        )
+
+        self.evict()
+
+    def _write_entry(self, entry: Entry):
+        data = json.dumps(entry.__dict__, ensure_ascii=False).encode("utf-8")
+        self._write(self._get_path(entry.url, ".json"), data)
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        # Запись через временный файл, чтобы не оставить в кэше половину ответа.
+        # Имя у временного файла свое у каждой записи, иначе одновременно обновляющие
+        # кэш процессы (например, gui и mini парсер) перезапишут файлы друг друга
+        f = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path),
+            prefix=os.path.basename(path) + ".",
+            suffix=".tmp",
+            delete=False,
+        )
+        try:
+            with f:
+                f.write(data)
+
+            os.replace(f.name, path)
+
+        except BaseException:
+            try:
+                os.remove(f.name)
+            except OSError:
+                pass
+
+            raise
+
+    def evict(self):
+        """Функция удаляет давно не использованные записи, пока их размер больше max_size."""
+
+        try:
+            with os.scandir(self.dir_name) as it:
+                bodies = [e for e in it if e.name.endswith(".body")]
+        except OSError:
+            return
+
+        items = []
+        for e in bodies:
+            stat = e.stat()
+            items.append((stat.st_mtime, stat.st_size, e.path))
+
+        size = sum(item_size for _, item_size, _ in items)
+        for _, item_size, path in sorted(items):
+            if size <= self.max_size:
+                break
+
+            for path_to_remove in (path, path[: -len(".body")] + ".json"):
+                try:
+                    os.remove(path_to_remove)
+                except OSError:
+                    pass
+
+            size -= item_size
+
+    def clear(self):
+        self.max_size, max_size = 0, self.max_size
+        try:
+            self.evict()
+        finally:
+            self.max_size = max_size
+
+
+def _open_url(
+    url: str, timeout: float, entry: FetchCache.Entry | None
+) -> "HTTPResponse | None":
+    """Функция открывает ссылку. Если передана запись кэша, то запрос будет условным,
+    а при ответе 304 вернется None.
+
+    """
+
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+
+    request = Request(url)
+    if entry:
+        if entry.etag:
+            request.add_header("If-None-Match", entry.etag)
+        if entry.last_modified:
+            request.add_header("If-Modified-Since", entry.last_modified)
+
+    try:
+        return urlopen(request, timeout=timeout)
+
+    except HTTPError as e:
+        if e.code != 304 or not entry:
+            raise
+
+        e.close()
+        return None
+
+
+def _iter_blocks(
+    rs: "HTTPResponse",
+    deadline: float,
+    progress: Callable[[int, int], None] | None = None,
+    is_cancelled: Callable[[], bool] | None = None,
+) -> Iterator[bytes]:
+    total = int(rs.headers.get("Content-Length") or 0)
+
+    done = 0
+    while True:
+        if is_cancelled and is_cancelled():
+            raise FetchCancelled(rs.url)
+
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Превышено время загрузки {rs.url}")
+
+        block = rs.read(BLOCK_SIZE)
+        if not block:
+            break
+
+        done += len(block)
+        if progress:
+            progress(done, total)
+
+        yield block
+
+
+def read_url(
+    url: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    progress: Callable[[int, int], None] | None = None,
+    is_cancelled: Callable[[], bool] | None = None,
+    cache: FetchCache | None = None,
+) -> tuple[str, bytes]:
+    """
+    Функция загружает ответ по ссылке блоками и возвращает итоговую ссылку (после
+    перенаправлений) и тело ответа.
+
+    progress вызывается после каждого блока с количеством загруженных байт и размером
+    ответа (0, если сервер его не указал). Если is_cancelled вернет True, то будет
+    выброшено FetchCancelled, а если загрузка длится дольше timeout -- TimeoutError.
+
+    Если передан cache, то запрос будет условным, а при ответе 304 тело вернется из кэша.
+
+    """
+
+    deadline = time.monotonic() + timeout
+
+    entry = cache.get(url) if cache else None
+    rs = _open_url(url, timeout, entry)
+    if rs is None:
+        body = cache.get_body(url)
+        if progress:
+            progress(len(body), len(body))
+
+        return entry.final_url, body
+
+    with rs:
+        data = b"".join(_iter_blocks(rs, deadline, progress, is_cancelled))
+
+        if cache:
+            cache.put(
+                url,
+                data,
+                rs.url,
+                rs.headers.get("ETag"),
+                rs.headers.get("Last-Modified"),
+            )
+
+        return rs.url, data
+
+
+def find_raw_url(url: str, blocks: Iterable[bytes]) -> str | None:
+    """
+    Функция ищет полную ссылку на первый файл с кнопкой Raw на странице гиста, которая
+    передается блоками. Блоки после найденной ссылки не читаются.
+
+    """
+
+    import html
+
+    from urllib.parse import urljoin
+
+    data = b""
+    for block in blocks:
+        data = data[-RAW_LINK_MAX_LENGTH:] + block
+
+        match = RAW_LINK_PATTERN.search(data)
+        if match:
+            rel_url = html.unescape(match.group(1).decode())
+            return urljoin(url, rel_url)
+
+    return None
+
+
+def resolve_raw_url(
+    url: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    progress: Callable[[int, int], None] | None = None,
+    is_cancelled: Callable[[], bool] | None = None,
+    cache: FetchCache | None = None,
+) -> str:
+    """
+    Функция возвращает ссылку на файл последней ревизии гиста.
+
+    Если в кэше есть ссылка, найденная в прошлый раз, то сервер только проверяет,
+    что страница не поменялась. Иначе страница загружается до найденной ссылки.
+
+    """
+
+    deadline = time.monotonic() + timeout
+
+    entry = cache.get(url) if cache else None
+    if entry and not entry.raw_url:
+        entry = None
+
+    rs = _open_url(url, timeout, entry)
+    if rs is None:
+        return entry.raw_url
+
+    with rs:
+        raw_url = find_raw_url(
+            rs.url, _iter_blocks(rs, deadline, progress, is_cancelled)
+        )
+        if not raw_url:
+            raise ValueError(f"На странице {url} не найдена ссылка на файл")
+
+        if cache:
+            cache.put(
+                url,
+                b"",
+                rs.url,
+                rs.headers.get("ETag"),
+                rs.headers.get("Last-Modified"),
+                raw_url,
+            )
+
+    return raw_url
+
+
+def fetch_gist_text(
+    url: str,
+    timeout: float = DEFAULT_TIMEOUT,
+    progress: Callable[[str, int, int], None] | None = None,
+    is_cancelled: Callable[[], bool] | None = None,
+    cache: FetchCache | None = None,
+) -> str:
+    """
+    Функция загружает текст файла последней ревизии гиста.
+
+    progress вызывается с этапом загрузки (STAGE_PAGE или STAGE_RAW), количеством
+    загруженных байт и размером ответа.
+
+    """
+
+    def _progress_by_stage(stage):
+        if not progress:
+            return None
+
+        return lambda done, total: progress(stage, done, total)
+
+    raw_url = resolve_raw_url(
+        url, timeout, _progress_by_stage(STAGE_PAGE), is_cancelled, cache
+    )
+
+    # Файл ревизии не меняется, его не нужно даже проверять на сервере
+    if cache and REVISION_URL_PATTERN.search(raw_url) and cache.get(raw_url):
+        content = cache.get_body(raw_url)
+        if progress:
+            progress(STAGE_RAW, len(content), len(content))
+
+        return content.decode()
+
+    _, content = read_url(
+        raw_url, timeout, _progress_by_stage(STAGE_RAW), is_cancelled, cache
+    )
+    return content.decode()
+
+
+if __name__ == "__main__":
+    import tempfile
+    import threading
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    print("Tests")
+
+    # Ссылка ищется и на границе блоков, а блоки после нее не читаются
+    read_blocks = []
+
+    def _iter_test_blocks(data, size):
+        for i in range(0, len(data), size):
+            read_blocks.append(i)
+            yield data[i : i + size]
+
+    page = (
+        b"<html>"
+        + b"x" * 1000
+        + b'<div class="file-actions flex-order-2">\n'
+        + b'  <a href="/u/g/raw/1/f.txt?a=1&amp;b=2" class="Button">Raw</a></div>'
+        + b"y" * 100_000
+    )
+    for size in (1, 7, 100, 1024):
+        read_blocks.clear()
+        assert (
+            find_raw_url("https://gist.github.com/u/g", _iter_test_blocks(page, size))
+            == "https://gist.github.com/u/g/raw/1/f.txt?a=1&b=2"
+        )
+        assert read_blocks[-1] < 1200
+
+    assert find_raw_url("https://gist.github.com/u/g", [b"<html></html>"]) is None
+
+    RAW_TEXT = "PC:\n  Foo\n- Bar 1-3\n" * 10_000
+    REVISION = "0123456789abcdef0123456789abcdef01234567"
+    PAGE = f"""
+<html><body>
+<div class="file-actions"><a href="/user/gist/raw/{REVISION}/gistfile1.txt">Raw</a></div>
+</body></html>
+    """
+    ETAG = '"page-v1"'
+
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append((self.path, self.headers.get("If-None-Match")))
+
+            if self.path == "/slow":
+                time.sleep(0.5)
+
+            is_page = self.path in ("/gist", "/slow")
+            if is_page and self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            body = PAGE if is_page else RAW_TEXT
+            body = body.encode()
+
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            if is_page:
+                self.send_header("ETag", ETAG)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    # После отмены или timeout клиент закрывает соединение, не дочитав ответ
+    server.handle_error = lambda request, client_address: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    stages = []
+    text = fetch_gist_text(
+        f"{base_url}/gist",
+        progress=lambda stage, done, total: stages.append((stage, done, total)),
+    )
+    assert text == RAW_TEXT
+    assert stages[-1] == (STAGE_RAW, len(RAW_TEXT), len(RAW_TEXT))
+    assert {stage for stage, _, _ in stages} == {STAGE_PAGE, STAGE_RAW}
+
+    try:
+        fetch_gist_text(f"{base_url}/gist", is_cancelled=lambda: True)
+        assert False, "Загрузка не была отменена"
+    except FetchCancelled:
+        pass
+
+    try:
+        fetch_gist_text(f"{base_url}/slow", timeout=0.1)
+        assert False, "Не сработал timeout"
+    except TimeoutError:
+        pass
+
+    with tempfile.TemporaryDirectory() as dir_name:
+        cache = FetchCache(dir_name)
+
+        requests.clear()
+        assert fetch_gist_text(f"{base_url}/gist", cache=cache) == RAW_TEXT
+        assert requests == [
+            ("/gist", None),
+            (f"/user/gist/raw/{REVISION}/gistfile1.txt", None),
+        ]
+
+        # Страница не поменялась (304), а файл ревизии берется из кэша без запроса
+        requests.clear()
+        assert fetch_gist_text(f"{base_url}/gist", cache=cache) == RAW_TEXT
+        assert requests == [("/gist", ETAG)]
+
+        # При превышении размера вытесняются давно не использованные записи
+        cache.put("a", b"a" * 10)
+        cache.put("b", b"b" * 10)
+        os.utime(cache._get_path("a", ".body"), (0, 0))
+        os.utime(cache._get_path("b", ".body"), (1, 1))
+        cache.get_body("a")
+
+        cache.max_size = len(RAW_TEXT) + 15
+        cache.evict()
+        assert cache.get("a")
+        assert cache.get("b") is None
+        assert cache.get(f"{base_url}/user/gist/raw/{REVISION}/gistfile1.txt")
+
+        cache.clear()
+        assert not os.listdir(dir_name)
+
+        # У каждой записи свой временный файл, после ошибки он удаляется
+        path = cache._get_path("c", ".body")
+        with open(path + ".tmp", "wb") as f:
+            f.write(b"other writer")
+        try:
+            cache._write(path, "not bytes")
+        except TypeError:
+            pass
+        else:
+            assert False, "Запись не упала"
+        assert os.listdir(dir_name) == [os.path.basename(path) + ".tmp"]
+
+    server.shutdown()
@@ -5,24 +5,63 @@ __author__ = "ipetrash"
 
 
 import fnmatch
+import hashlib
+import sys
 import time
 import re
 
 from collections import defaultdict
-from enum import Enum
+from functools import lru_cache
+from typing import NamedTuple, Sequence
 
 from common import get_logger
+from played_games_columnar import ColumnarResult
+from played_games_profile import (
+    STAGE_DELETE_EMPTY,
+    STAGE_EVENTS,
+    STAGE_FILTER,
+    STAGE_INSERT,
+    STAGE_INSERT_INDEX,
+    STAGE_SEQUENCE,
+    STAGE_SORT,
+    STAGE_SPLIT_CHUNKS,
+    STAGE_SPLIT_LINES,
+    measure,
+)
+from played_games_stream import (
+    ALL_ATTRIBUTES_GAMES,
+    CATEGORY_BY_ATTRIBUTES,
+    DEFAULT_FILTER_IGNORE_CASE,
+    MAX_GAME_NAME_SEQUENCE_SIZE,
+    CategoryEnum,
+    Diagnostic,
+    DiagnosticEvent,
+    DiagnosticKind,
+    Diagnostics,
+    GameNameSequence,
+    PlatformEvent,
+    get_line_prefix,
+    iter_lines,
+    iter_parse_events,
+    iter_parse_events_from_file,
+    iter_platform_chunks,
+    parse_chunks,
+)
 
 
-logger = get_logger("played_games_parser")
+# Предупреждения о строках списка могут идти тысячами, поэтому пишутся в фоне
+logger = get_logger("played_games_parser", asynchronous=True)
 
 # Регулярка вытаскивает выражения вида: 1, 2, 3 или 1-3, или римские цифры: III, IV
 PARSE_GAME_NAME_PATTERN = re.compile(
     r"(\d+(, ?\d+)+)|(\d+ *?- *?\d+)|([MDCLXVI]+(, ?[MDCLXVI]+)+)", flags=re.IGNORECASE
 )
 
+# Количество названий игр с частями, результат разбора которых хранится в кэше
+PARSE_GAME_NAME_CACHE_SIZE = 4096
+
 
-def parse_game_name(game_name: str) -> list:
+def parse_game_name(game_name: str) -> list[str]:
     """
     Функция принимает название игры и пытается разобрать его, после возвращает список названий.
     У некоторых игр в названии может указываться ее части или диапазон частей, поэтому для правильного
@@ -35,9 +74,31 @@ def parse_game_name(game_name: str) -> list:
 
     """
 
+    return list(parse_game_name_sequence(game_name))
+
+
+def parse_game_name_sequence(game_name: str) -> Sequence[str]:
+    """
+    Функция аналогична parse_game_name, но части возвращаются в GameNameSequence,
+    названия которой создаются только при переборе, поэтому размер диапазона можно
+    проверить заранее через len. Результат неизменяемый и может быть общим для вызовов.
+
+    """
+
+    # Части перечисляются через запятую или задаются диапазоном через дефис,
+    # поэтому в названиях без этих символов регулярка ничего не найдет
+    if "," not in game_name and "-" not in game_name:
+        return [game_name]
+
+    # Результат в кэше общий для всех вызовов, но он неизменяемый
+    return _parse_game_name_cached(game_name)
+
+
+@lru_cache(maxsize=PARSE_GAME_NAME_CACHE_SIZE)
+def _parse_game_name_cached(game_name: str) -> Sequence[str]:
     match = PARSE_GAME_NAME_PATTERN.search(game_name)
     if match is None:
-        return [game_name]
+        return (game_name,)
 
     seq_str = match.group(0)
 
@@ -58,40 +119,163 @@ def parse_game_name(game_name: str) -> list:
         # ['1', '7'] -> [1, 7]
         seq = list(map(int, seq))
 
-        # [1, 7] -> ['1', '2', '3', '4', '5', '6', '7']
-        seq = list(map(str, range(seq[0], seq[1] + 1)))
+        # [1, 7] -> range(1, 8), номера не создаются, пока их не переберут
+        seq = range(seq[0], seq[1] + 1)
 
     else:
-        logger.warning(f'Unknown seq str = "{seq_str}".')
-        return [game_name]
+        logger.warning('Unknown seq str = "%s".', seq_str)
+        return (game_name,)
 
-    # Сразу проверяем номер игры в серии и если она первая, то не добавляем в названии ее номер
-    return [base_name if num == "1" else base_name + " " + num for num in seq]
+    return GameNameSequence(base_name, seq)
 
 
-class Parser:
-    """Класс парсера. Содержит словарь платформ и объект неопределенных игр."""
+# Символы, имеющие особое значение в wildcard выражении
+WILDCARD_SPECIAL_CHARS = "*?["
 
-    class CategoryEnum(Enum):
-        """Перечисление видов категории."""
+# Количество последних скомпилированных выражений фильтрации, которые будут храниться в кэше
+FILTER_CACHE_SIZE = 128
 
-        # Четыре ниже используется для идентификации игр и платформ
-        # OTHER -- только для идентифакации игр, т.к. у неопределенных игр нет категорий
-        FINISHED_GAME = 0
-        NOT_FINISHED_GAME = 1
-        FINISHED_WATCHED = 2
-        NOT_FINISHED_WATCHED = 3
-        OTHER = 4
 
-        def __str__(self):
-            return f"{self.name}"
+class WildcardMatcher:
+    """Класс скомпилированного wildcard выражения фильтрации игр.
 
-        def __repr__(self):
-            return self.__str__()
+    Для простых выражений вида "foo", "foo*", "*foo" и "*foo*" регулярка не используется,
+    вместо нее проверка выполняется методами строки.
+
+    """
+
+    def __init__(self, pattern: str, ignore_case: bool = DEFAULT_FILTER_IGNORE_CASE):
+        self.pattern = pattern
+        self.ignore_case = ignore_case
+
+        if ignore_case:
+            pattern = pattern.lower()
+
+        # Начало, с которого начинаются все подходящие названия
+        self.prefix = WildcardMatcher._get_prefix(pattern)
+
+        match = WildcardMatcher._compile(pattern)
+        if ignore_case:
+            self.match = lambda name: match(name.lower())
+        else:
+            self.match = match
+
+    @staticmethod
+    def _has_special_chars(pattern: str) -> bool:
+        return any(c in pattern for c in WILDCARD_SPECIAL_CHARS)
+
+    @staticmethod
+    def _get_prefix(pattern: str) -> str:
+        for i, c in enumerate(pattern):
+            if c in WILDCARD_SPECIAL_CHARS:
+                return pattern[:i]
+
+        return pattern
+
+    @staticmethod
+    def _compile(pattern: str):
+        if not WildcardMatcher._has_special_chars(pattern):
+            return pattern.__eq__
+
+        text = pattern.strip("*")
+        if WildcardMatcher._has_special_chars(text):
+            return re.compile(fnmatch.translate(pattern)).match
+
+        if not text:
+            return lambda name: True
+
+        starts_with_any = pattern.startswith("*")
+        ends_with_any = pattern.endswith("*")
+
+        if starts_with_any and ends_with_any:
+            return lambda name: text in name
+
+        if starts_with_any:
+            return lambda name: name.endswith(text)
+
+        return lambda name: name.startswith(text)
+
+    def may_match_any(self, names: Sequence[str]) -> bool:
+        """Функция проверяет, может ли выражению подойти хоть одно название из names,
+        по началу выражения. Части игры из GameNameSequence отсекаются целиком
+        по базовому названию, без создания названий частей.
+
+        """
+
+        prefix = self.prefix
+        if not prefix:
+            return True
+
+        if type(names) is GameNameSequence:
+            return names.may_start_with(prefix, self.ignore_case)
+
+        if self.ignore_case:
+            return any(name.lower().startswith(prefix) for name in names)
+
+        return any(name.startswith(prefix) for name in names)
+
+    def __call__(self, name: str) -> bool:
+        return bool(self.match(name))
+
+    def __str__(self):
+        return f'WildcardMatcher "{self.pattern}" (ignore_case={self.ignore_case})'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def compile_filter(
+    filter_exp: str, ignore_case: bool = DEFAULT_FILTER_IGNORE_CASE
+) -> WildcardMatcher:
+    """
+    Функция компилирует wildcard выражение фильтрации игр.
+    Последние скомпилированные выражения хранятся в кэше.
+
+    """
+
+    # Для возможности поиска просто по словам:
+    if not filter_exp.endswith("*"):
+        filter_exp += "*"
+
+    return WildcardMatcher(filter_exp, ignore_case)
+
+
+def _parse_index_chunks(
+    chunks, parse_game_name_on_sequence, selection=None, stats=None
+):
+    """Функция разбирает куски текста в разделы индекса. Вызывается в том числе
+    в процессах пула, поэтому ничего не пишет в лог, а возвращает для каждого куска
+    кортеж (разделы, замечания).
+
+    """
+
+    index = Parser.Index(parse_game_name_on_sequence, selection)
+
+    results = list()
+    for chunk, line_number in chunks:
+        diagnostics = Diagnostics()
+
+        lines = iter_lines(chunk)
+        if stats is not None:
+            lines = list(stats.wrap_iter(STAGE_SPLIT_LINES, lines))
+
+        events = iter_parse_events(lines, line_number)
+        results.append((index._parse_events(events, diagnostics, stats), diagnostics))
+
+    return results
+
+
+class Parser:
+    """Класс парсера. Содержит словарь платформ и объект неопределенных игр."""
+
+    CategoryEnum = CategoryEnum
 
     class Game:
         """Класс игры. Содержит название игры и категорию, в которую игра входит."""
 
+        __slots__ = ("name", "category")
+
         def __init__(self, name=None, category=None):
             self.name = name
             self.category = category
@@ -112,28 +296,38 @@ class Parser:
 
         """
 
+        __slots__ = ("kind", "platform", "_games")
+
         def __init__(self, kind=None, platform=None):
             self.kind = kind
             self.platform = platform
 
+            # Ключом словаря будет имя игры, а значением объект игры -- Parser.Game.
+            # Словарь сохраняет порядок добавления и используется для проверки дубликатов
+            self._games = dict()
+
         @property
         def game_list(self):
-            return self.platform.get_game_list(self.kind)
+            return list(self._games.values())
 
         def sort_game_list(self, key=lambda x: x.name, reverse=False):
-            self.game_list.sort(key=key, reverse=reverse)
+            games = sorted(self._games.values(), key=key, reverse=reverse)
+            self._games = {game.name: game for game in games}
 
         @property
         def count(self):
             """Свойство возвращает количество игр в категории."""
 
-            return len(self.game_list)
+            return len(self._games)
 
         def add(self, name):
             self.platform.add_game(name, self)
 
+        def __contains__(self, name):
+            return name in self._games
+
         def __iter__(self):
-            return self.game_list.__iter__()
+            return iter(self._games.values())
 
         def next(self):
             return self.game_list.next()
@@ -148,40 +342,49 @@ class Parser:
         """Класс платформы. Содержит название, словарь категорий платформы и список
         всех игр платформы.
 
+        Владелец платформы (парсер или объект неопределенных игр) ведет общий счетчик
+        игр, который увеличивается при добавлении игры на платформу.
+
         """
 
-        def __init__(self, name=None):
+        __slots__ = ("name", "owner", "categories", "_count_games")
+
+        def __init__(self, name=None, owner=None):
             self.name = name
-            self.categories = dict()
+            self.owner = owner
 
-            # Ключом словаря будет вид категории, а значением список игр
-            self._game_list_by_category_kind = defaultdict(list)
+            # Игры хранятся только в категориях
+            self.categories = dict()
 
-            # Используется для проверки дублирующихся в категории игр
-            # Ключом словаря будет кортеж имени игры и категории, а значением объект игры -- Parser.Game
-            self._game_name_dict = dict()
+            # Количество игр на платформе
+            self._count_games = 0
 
         def get_game_list(self, category_kind):
-            return self._game_list_by_category_kind[category_kind]
+            if category_kind not in self.categories:
+                return []
+
+            return self.categories[category_kind].game_list
 
         def add_game(self, game_name, category):
             """Добавление игры в указанную категорию."""
 
-            # Если игра с такой категории в списке всех игр уже есть
-            if (game_name, category.kind) in self._game_name_dict:
-                logger.warning(
-                    f'Предотвращено добавление дубликата игры "{game_name}" в категорию {category.kind}.'
-                )
+            # Если игра с такой категории в списке всех игр уже есть. Дубликаты из текста
+            # отсеивает индекс и учитывает в замечаниях, а сюда повтор попадает, например,
+            # для строки неопределенной игры с частями: она добавляется по каждой части
+            if game_name in category:
                 return
 
-            game = Parser.Game(game_name, category)
+            # Одинаковые названия на разных платформах и в разных категориях будут одной строкой
+            game_name = sys.intern(game_name)
+            category._games[game_name] = Parser.Game(game_name, category)
 
-            self.get_game_list(category.kind).append(game)
-            self._game_name_dict[(game_name, category.kind)] = game
+            self._count_games += 1
+            if self.owner is not None:
+                self.owner._count_games += 1
 
         @property
         def count_games(self):
-            return len(self.game_list)
+            return self._count_games
 
         @property
         def count_categories(self):
@@ -191,7 +394,9 @@ class Parser:
         def game_list(self):
             """Нередактируемый список всех игр на платформе."""
 
-            return frozenset(self._game_name_dict.values())
+            return frozenset(
+                game for category in self.categories.values() for game in category
+            )
 
         def get(self, kind_category):
             """Получение категории по перечислению. Если категории нет, она будет создана."""
@@ -215,9 +420,16 @@ class Parser:
         def __init__(self):
             self.platforms = dict()
 
+            # Количество игр на всех платформах
+            self._count_games = 0
+
+        def clear(self):
+            self.platforms.clear()
+            self._count_games = 0
+
         @property
         def count_games(self):
-            return sum([p.count_games for p in self.platforms.values()])
+            return self._count_games
 
         @property
         def count_platforms(self):
@@ -234,7 +446,7 @@ class Parser:
             """
 
             if name_platform not in self.platforms:
-                platform = Parser.Platform(name_platform)
+                platform = Parser.Platform(name_platform, self)
                 self.platforms[name_platform] = platform
                 return platform
 
@@ -246,11 +458,552 @@ class Parser:
         def __repr__(self):
             return self.__str__()
 
-    ALL_ATTRIBUTES_GAMES = " -@"
+    class Index:
+        """Класс индекса разобранного текста. Текст разбирается один раз, после чего
+        фильтрация выполняется по уже разобранным записям.
+
+        Запись индекса -- кортеж (имя_платформы, вид_категории, имя_для_фильтра, имя_игры).
+        У игр с неизвестными атрибутами имя_игры -- вся строка, а фильтруются они по имени.
+
+        Записи хранятся по разделам: раздел -- это платформа от заголовка до следующего
+        заголовка. При обновлении индекса через update заново разбираются только
+        изменившиеся куски текста, а разделы неизменившихся кусков переиспользуются.
+
+        """
+
+        class Section:
+            """Класс раздела индекса. Содержит имя платформы и записи ее игр."""
+
+            __slots__ = ("platform", "entries", "other_entries")
+
+            def __init__(self, platform):
+                self.platform = platform
+                self.entries = list()
+
+                # Записи неопределенных игр, они же есть и в entries
+                self.other_entries = list()
+
+            def __str__(self):
+                return f"Section {self.platform} ({len(self.entries)})"
+
+            def __repr__(self):
+                return self.__str__()
+
+        class Selection(NamedTuple):
+            """Отбор игр при построении индекса под один разбор, как в Parser.parse.
+
+            Игры других категорий в индекс не попадают, и их названия даже не разбираются
+            на части. Части игры не попадают в индекс целиком, если по базовому названию
+            ни одна из них не подходит под начало выражения фильтрации.
+
+            """
+
+            filter_exp: str
+            ignore_case: bool
+            categories: tuple
+
+            @staticmethod
+            def create(filter_exp, ignore_case, categories):
+                """Функция возвращает отбор или None, если отбор ничего не отсеет."""
+
+                categories = tuple(categories)
+                if (
+                    set(categories) >= set(CategoryEnum)
+                    and not compile_filter(filter_exp, ignore_case).prefix
+                ):
+                    return None
+
+                return Parser.Index.Selection(filter_exp, ignore_case, categories)
+
+            def covers(self, filter_exp, ignore_case, categories):
+                """Функция проверяет, что все игры, подходящие под фильтры, есть в индексе."""
+
+                if not set(categories) <= set(self.categories):
+                    return False
+
+                prefix = compile_filter(self.filter_exp, self.ignore_case).prefix
+                if not prefix:
+                    return True
+
+                return ignore_case == self.ignore_case and compile_filter(
+                    filter_exp, ignore_case
+                ).prefix.startswith(prefix)
+
+        def __init__(self, parse_game_name_on_sequence=True, selection=None):
+            self.parse_game_name_on_sequence = parse_game_name_on_sequence
+
+            # Отбор игр, Parser.Index.Selection. Если None, то в индексе все игры текста
+            self.selection = selection
+
+            # Имена платформ в порядке их появления в тексте
+            self.platform_names = list()
+            self.sections = list()
+            self.entries = list()
+
+            # Платформы, разделы которых поменялись с момента последнего вызова
+            # Parser.apply_filter. None -- индекс построен заново
+            self.changed_platforms = None
+
+            # Замечания к разобранному тексту
+            self.diagnostics = Diagnostics()
+
+            # Список кортежей (хеш куска текста, разделы куска, замечания к куску,
+            # номер первой строки куска) из последнего разбора текста
+            self._chunks = list()
+
+            # Результат последней фильтрации. Если новое выражение получено дописыванием
+            # символов к предыдущему, то проверяются только записи из прошлого результата
+            self._last_filter_exp = None
+            self._last_ignore_case = None
+            self._last_categories = None
+            self._last_entries = None
+
+        def copy(self):
+            """Функция возвращает копию индекса, которую можно обновить через update
+            в другом потоке, не мешая фильтрации по этому индексу. Разделы после разбора
+            не меняются, поэтому они общие у индекса и копии.
+
+            """
+
+            index = Parser.Index(self.parse_game_name_on_sequence, self.selection)
+            index.platform_names = self.platform_names
+            index.sections = self.sections
+            index.entries = self.entries
+            index.diagnostics = self.diagnostics
+            index._chunks = list(self._chunks)
+
+            if self.changed_platforms is not None:
+                index.changed_platforms = set(self.changed_platforms)
+
+            return index
+
+        def build(self, text, parallel=False, stats=None, keep_chunks=True):
+            """Функция разбирает текст в индекс.
+
+            Args:
+                text (str | Iterable[str]): строка с играми или итерируемый объект строк,
+                    например, открытый файл
+                parallel (bool): разбирать разделы платформ в пуле процессов.
+                    Работает только для строки
+                stats (ParseStats | None): статистика, в которую добавятся замеры этапов
+                keep_chunks (bool): запомнить куски строки для обновления индекса
+                    через update. Для разового разбора строка разбирается построчно,
+                    без деления на куски и их хеширования, если не нужен пул процессов
+            """
+
+            if isinstance(text, str) and (keep_chunks or parallel):
+                self._chunks.clear()
+                self.update(text, parallel, stats)
+                self.changed_platforms = None
+                return
+
+            lines = iter_lines(text) if isinstance(text, str) else text
+            if stats is not None:
+                lines = list(stats.wrap_iter(STAGE_SPLIT_LINES, lines))
+
+            self.build_from_events(iter_parse_events(lines), stats)
+
+        def build_from_file(self, file_name, encoding="utf-8", stats=None):
+            """Функция разбирает файл в индекс. Файл не читается целиком, а отображается в память.
+            Строки файла разбиваются при разборе, поэтому в замерах это время входит
+            в определение платформ и атрибутов.
+
+            """
+
+            self.build_from_events(
+                iter_parse_events_from_file(file_name, encoding), stats
+            )
+
+        def build_from_events(self, events, stats=None):
+            logger.debug("Start parsing")
+            t = time.perf_counter()
+
+            self._chunks.clear()
+
+            diagnostics = Diagnostics()
+            sections = self._parse_events(events, diagnostics, stats)
+
+            with measure(stats, STAGE_INSERT_INDEX):
+                self._set_sections(sections, diagnostics)
+            self.changed_platforms = None
+
+            self._log_diagnostics(diagnostics)
+
+            logger.debug(
+                f"Finish parsing. Entries: {len(self.entries)}. "
+                f"Elapsed time: {time.perf_counter() - t:.3f} sec."
+            )
+
+        def update(self, text, parallel=False, stats=None):
+            """Функция обновляет индекс по новой версии текста. Заново разбираются только
+            куски текста (от заголовка платформы до следующего заголовка), которых не было
+            в прошлой версии. Платформы с изменившимися разделами добавляются в changed_platforms.
+
+            При parallel=True новые куски разбираются в пуле процессов, результат
+            и замечания будут такими же, как при обычном разборе. Замеры из процессов
+            пула не вернуть, поэтому со stats разбор всегда идет в текущем процессе.
+
+            """
+
+            logger.debug("Start updating")
+            t = time.perf_counter()
+
+            old_chunks = defaultdict(list)
+            for digest, sections, diagnostics, line_number in self._chunks:
+                old_chunks[digest].append((sections, diagnostics, line_number))
+
+            chunks = list()
+            new_chunks = list()
+
+            platform_chunks = iter_platform_chunks(text)
+            if stats is not None:
+                platform_chunks = stats.wrap_iter(STAGE_SPLIT_CHUNKS, platform_chunks)
+
+            for chunk, line_number in platform_chunks:
+                digest = hashlib.blake2b(
+                    chunk.encode("utf-8", "surrogatepass"), digest_size=16
+                ).digest()
+
+                if old_chunks[digest]:
+                    sections, diagnostics, old_line_number = old_chunks[digest].pop(0)
+                    if diagnostics and line_number != old_line_number:
+                        diagnostics = diagnostics.shift_line_numbers(
+                            line_number - old_line_number
+                        )
+
+                    chunks.append((digest, sections, diagnostics, line_number))
+                else:
+                    # Место под разделы, которые будут получены после разбора
+                    chunks.append((digest, None, None, line_number))
+                    new_chunks.append((chunk, line_number))
+
+            parsed = iter(
+                parse_chunks(
+                    _parse_index_chunks,
+                    new_chunks,
+                    self.parse_game_name_on_sequence,
+                    self.selection,
+                    stats,
+                    max_workers=None if parallel and stats is None else 1,
+                )
+            )
+            # Примеры замечаний в лог пишутся только по заново разобранным кускам
+            new_diagnostics = Diagnostics()
+            for i, (digest, sections, _, line_number) in enumerate(chunks):
+                if sections is None:
+                    sections, chunk_diagnostics = next(parsed)
+                    new_diagnostics.merge(chunk_diagnostics)
+
+                    chunks[i] = digest, sections, chunk_diagnostics, line_number
+
+            diagnostics = Diagnostics()
+            for _, _, chunk_diagnostics, _ in chunks:
+                diagnostics.merge(chunk_diagnostics)
+
+            old_sections = self.sections
+
+            self._chunks = chunks
+            with measure(stats, STAGE_INSERT_INDEX):
+                self._set_sections(
+                    [section for _, sections, _, _ in chunks for section in sections],
+                    diagnostics,
+                )
+
+            # Платформа изменилась, если поменялся набор или порядок ее разделов
+            old_sections_by_platform = defaultdict(list)
+            for section in old_sections:
+                old_sections_by_platform[section.platform].append(id(section))
+
+            new_sections_by_platform = defaultdict(list)
+            for section in self.sections:
+                new_sections_by_platform[section.platform].append(id(section))
+
+            changed_platforms = {
+                name
+                for name in old_sections_by_platform.keys()
+                | new_sections_by_platform.keys()
+                if old_sections_by_platform[name] != new_sections_by_platform[name]
+            }
+            if self.changed_platforms is not None:
+                self.changed_platforms |= changed_platforms
+
+            self._log_diagnostics(new_diagnostics)
+
+            logger.debug(
+                f"Finish updating. Parsed chunks: {len(new_chunks)} of {len(chunks)}. "
+                f"Changed platforms: {len(changed_platforms)}. "
+                f"Elapsed time: {time.perf_counter() - t:.3f} sec."
+            )
+
+        def _parse_events(
+            self,
+            events,
+            diagnostics,
+            stats=None,
+            parse_game_name_sequence=parse_game_name_sequence,
+        ):
+            """Функция разбирает события в список разделов.
+            Замечания к тексту добавляются в diagnostics.
+
+            """
+
+            # Со статистикой события и разбор названий замеряются через обертки,
+            # а в добавление в индекс идет оставшееся время
+            if stats is not None:
+                with stats.measure(
+                    STAGE_INSERT_INDEX, exclude=(STAGE_EVENTS, STAGE_SEQUENCE)
+                ):
+                    return self._parse_events(
+                        stats.wrap_iter(STAGE_EVENTS, events),
+                        diagnostics,
+                        parse_game_name_sequence=stats.wrap(
+                            STAGE_SEQUENCE, parse_game_name_sequence
+                        ),
+                    )
+
+            sections = list()
+            section = None
+
+            # Используется для отсева дублирующихся в категории игр
+            added_games = set()
+
+            categories = None
+            may_match_any = None
+            if self.selection is not None:
+                categories = self.selection.categories
+                may_match_any = compile_filter(
+                    self.selection.filter_exp, self.selection.ignore_case
+                ).may_match_any
+
+            for event in events:
+                if type(event) is PlatformEvent:
+                    section = Parser.Index.Section(event.name)
+                    sections.append(section)
+                    continue
+
+                name_platform = event.platform
+
+                # Строки платформы без имени (заголовок ":") пропускаются
+                if not name_platform:
+                    continue
+
+                if type(event) is DiagnosticEvent:
+                    diagnostics.add(
+                        Diagnostic(
+                            event.kind, name_platform, event.line, event.line_number
+                        )
+                    )
+                    continue
+
+                kind = event.category
+
+                # Игры отсеянных категорий стоят только определения категории
+                if categories is not None and kind not in categories:
+                    continue
+
+                game_name_list = (
+                    parse_game_name_sequence(event.name)
+                    if self.parse_game_name_on_sequence
+                    else [event.name]
+                )
+
+                # Части игры отсеиваются по базовому названию, до создания их названий
+                if may_match_any is not None and not may_match_any(game_name_list):
+                    continue
+
+                # Названия частей создаются при переборе, поэтому опечатка
+                # в диапазоне отсекается до создания игр
+                if len(game_name_list) > MAX_GAME_NAME_SEQUENCE_SIZE:
+                    diagnostics.add(
+                        Diagnostic(
+                            DiagnosticKind.SEQUENCE_TOO_LONG,
+                            name_platform,
+                            event.name,
+                            event.line_number,
+                            kind,
+                        )
+                    )
+                    game_name_list = [event.name]
+
+                # К неопределенным играм с неизвестными атрибутами попадает вся строка,
+                # но фильтруется она по имени игры
+                is_unknown_attributes = (
+                    kind == Parser.CategoryEnum.OTHER
+                    and get_line_prefix(event.attributes).diagnostic_kind
+                    == DiagnosticKind.UNKNOWN_ATTRIBUTE
+                )
+                if is_unknown_attributes:
+                    line = event.line
+
+                # В ключе отсева дубликатов вид категории хранится числом: хеш
+                # перечисления считается в Python, а хеш числа -- нет
+                is_other = kind == Parser.CategoryEnum.OTHER
+                kind_value = kind.value
+
+                for game_name in game_name_list:
+                    # Одинаковые названия будут одной строкой
+                    game_name = sys.intern(game_name)
+
+                    entry = (
+                        name_platform,
+                        kind,
+                        game_name,
+                        line if is_unknown_attributes else game_name,
+                    )
+
+                    # Если игра с такой категорией на платформе уже есть. У неопределенных
+                    # игр учитывается и показываемое название, и имя для фильтра
+                    if is_other:
+                        key = name_platform, kind_value, game_name, entry[3]
+                    else:
+                        key = name_platform, kind_value, game_name
+
+                    if key in added_games:
+                        diagnostics.add(
+                            Diagnostic(
+                                DiagnosticKind.DUPLICATE_GAME,
+                                name_platform,
+                                entry[3],
+                                event.line_number,
+                                kind,
+                            )
+                        )
+                        continue
+
+                    added_games.add(key)
+
+                    section.entries.append(entry)
+                    if is_other:
+                        section.other_entries.append(entry)
+
+            return sections
+
+        def _set_sections(self, sections, diagnostics):
+            """Функция заполняет индекс по разделам. Замечания к разделам передаются
+            в diagnostics, туда же добавятся дубликаты между разделами одной платформы.
+
+            """
+
+            self.sections = sections
+            self.diagnostics = diagnostics
+            self.platform_names = list(dict.fromkeys(s.platform for s in sections))
+
+            self._last_filter_exp = None
+            self._last_ignore_case = None
+            self._last_categories = None
+            self._last_entries = None
+
+            # Дубликаты внутри раздела уже отсеяны. Если у платформы несколько разделов,
+            # то нужно отсеять дубликаты между ними
+            number_sections = defaultdict(int)
+            for section in sections:
+                number_sections[section.platform] += 1
+
+            added_games = defaultdict(set)
+
+            self.entries = list()
+            for section in sections:
+                if number_sections[section.platform] == 1:
+                    self.entries.extend(section.entries)
+                    continue
+
+                platform_games = added_games[section.platform]
+                for entry in section.entries:
+                    name_platform, kind, filter_name, game_name = entry
+                    if kind == Parser.CategoryEnum.OTHER:
+                        key = kind.value, filter_name, game_name
+                    else:
+                        key = kind.value, filter_name
+                    if key in platform_games:
+                        diagnostics.add(
+                            Diagnostic(
+                                DiagnosticKind.DUPLICATE_GAME,
+                                name_platform,
+                                game_name,
+                                category=kind,
+                            )
+                        )
+                        continue
+
+                    platform_games.add(key)
+                    self.entries.append(entry)
+
+        def _log_diagnostics(self, examples):
+            """Функция пишет в лог сводку замечаний индекса, а сохраненные
+            в examples записи -- на уровне DEBUG. Текст записей формируется
+            только если они попадут в лог.
+
+            """
+
+            if not self.diagnostics:
+                return
+
+            logger.warning(f"Замечания к тексту: {self.diagnostics.summary()}.")
+            for diagnostic in examples:
+                logger.debug("%s", diagnostic)
+
+        def _is_narrowing(self, filter_exp, ignore_case, categories):
+            # Выражение с [ ] может поменять смысл при дописывании символов,
+            # например, "[ab" -- это текст, а "[ab]" -- уже набор символов
+            return (
+                self._last_filter_exp is not None
+                and self._last_ignore_case == ignore_case
+                and filter_exp.startswith(self._last_filter_exp)
+                and "[" not in self._last_filter_exp
+                and (
+                    self._last_categories is None
+                    or categories is not None
+                    and set(categories) <= set(self._last_categories)
+                )
+            )
+
+        def filter(
+            self, filter_exp="", ignore_case=DEFAULT_FILTER_IGNORE_CASE, categories=None
+        ):
+            """Функция возвращает список записей, имя которых подходит под wildcard выражение.
+            Если указаны categories, то записи других категорий отсеиваются до проверки
+            выражения.
+
+            """
+
+            entries = (
+                self._last_entries
+                if self._is_narrowing(filter_exp, ignore_case, categories)
+                else self.entries
+            )
+
+            # Выражение компилируется один раз, а не для каждой игры
+            match = compile_filter(filter_exp, ignore_case).match
+            if categories is None:
+                result = [e for e in entries if match(e[2])]
+            else:
+                categories = tuple(categories)
+                result = [e for e in entries if e[1] in categories and match(e[2])]
+
+            self._last_filter_exp = filter_exp
+            self._last_ignore_case = ignore_case
+            self._last_categories = categories
+            self._last_entries = result
+
+            return result
+
+    ALL_ATTRIBUTES_GAMES = ALL_ATTRIBUTES_GAMES
+    CATEGORY_BY_ATTRIBUTES = CATEGORY_BY_ATTRIBUTES
 
     def __init__(self):
         self.platforms = dict()
         self.other = Parser.Other()
+        self.index = None
+
+        # Количество игр на платформах, без учета неопределенных игр
+        self._count_games = 0
+
+        # Индекс и параметры последнего вызова apply_filter
+        self._last_filter_state = None
+
+        # Статистика этапов разбора, played_games_profile.ParseStats.
+        # Если None, то этапы не замеряются
+        self.stats = None
 
     @property
     def games(self):
@@ -264,12 +1017,18 @@ class Parser:
 
     @property
     def count_games(self):
-        return len(self.games)
+        return self._count_games + self.other.count_games
 
     @property
     def count_platforms(self):
         return len(self.platforms)
 
+    @property
+    def diagnostics(self):
+        """Замечания к тексту, по которому построен индекс."""
+
+        return self.index.diagnostics if self.index is not None else Diagnostics()
+
     def get(self, name_platform):
         """Функция возращает ссылку на объект Платформа. Если платформа с таким именем
         не существует, она будет будет создана.
@@ -277,7 +1036,7 @@ class Parser:
         """
 
         if name_platform not in self.platforms:
-            platform = Parser.Platform(name_platform)
+            platform = Parser.Platform(name_platform, self)
             self.platforms[name_platform] = platform
             return platform
 
@@ -294,11 +1053,84 @@ class Parser:
         for name in platform_on_delete:
             del platforms[name]
 
-    def parse(
+    def build_index(
         self,
         text,
-        filter_exp="",
         parse_game_name_on_sequence=True,
+        incremental=False,
+        parallel=False,
+        selection=None,
+        keep_chunks=True,
+    ):
+        """Функция разбирает строку игр в индекс, по которому затем выполняется фильтрация.
+
+        Args:
+            text (str | Iterable[str]): строка с играми или итерируемый объект строк
+            parse_game_name_on_sequence (bool): нужно ли в названиии игры искать указание ее частей
+            incremental (bool): если индекс уже есть, то разобрать только изменившиеся
+                разделы платформ. Работает только для строки
+            parallel (bool): разбирать разделы платформ в пуле процессов.
+                Работает только для строки, небольшие тексты все равно разбираются
+                в текущем процессе
+            selection (Parser.Index.Selection | None): отбор игр, только под который
+                затем можно фильтровать индекс
+            keep_chunks (bool): запомнить куски строки, чтобы следующий вызов
+                с incremental=True разобрал только изменившиеся разделы
+        """
+
+        if (
+            incremental
+            and isinstance(text, str)
+            and self.index is not None
+            and self.index.parse_game_name_on_sequence == parse_game_name_on_sequence
+            and self.index.selection == selection
+        ):
+            self.index.update(text, parallel, self.stats)
+        else:
+            self.index = Parser.Index(parse_game_name_on_sequence, selection)
+            self.index.build(text, parallel, self.stats, keep_chunks)
+
+        if self.stats is not None:
+            self.stats.finish("build_index")
+
+        return self.index
+
+    def set_index(self, index):
+        """Функция заменяет индекс на готовый, например, построенный в другом потоке.
+        Если новый индекс -- обновленная через update копия текущего, то следующий
+        apply_filter с теми же фильтрами заново заполнит только изменившиеся платформы.
+
+        """
+
+        if (
+            self._last_filter_state is not None
+            and self._last_filter_state[0] is self.index
+            and index.changed_platforms is not None
+        ):
+            self._last_filter_state = (index,) + self._last_filter_state[1:]
+
+        self.index = index
+
+    def build_index_from_file(
+        self,
+        file_name,
+        parse_game_name_on_sequence=True,
+        encoding="utf-8",
+        selection=None,
+    ):
+        """Функция аналогична build_index, но разбирает локальный файл без чтения его в память."""
+
+        self.index = Parser.Index(parse_game_name_on_sequence, selection)
+        self.index.build_from_file(file_name, encoding, self.stats)
+
+        if self.stats is not None:
+            self.stats.finish("build_index")
+
+        return self.index
+
+    def apply_filter(
+        self,
+        filter_exp="",
         sort_game=False,
         sort_reverse=False,
         show_only_categories=(
@@ -308,135 +1140,324 @@ class Parser:
             CategoryEnum.NOT_FINISHED_WATCHED,
             CategoryEnum.OTHER,
         ),
+        filter_ignore_case=DEFAULT_FILTER_IGNORE_CASE,
     ):
-        """Функция парсит строку игр.
+        """Функция заполняет платформы играми из индекса, подходящими под фильтры.
+        Перед вызовом индекс должен быть построен через build_index.
 
         Args:
-            text (str): строка с играми
             filter_exp (str): wildcard выражение фильтрации игр
-            parse_game_name_on_sequence (bool): параметр определяет нужно ли в названиии
-                игры искать указание ее частей. Например,
-                "Resident Evil 4, 5, 6" станет:
-                Resident Evil 4
-                Resident Evil 5
-                Resident Evil 6
-
-                "Resident Evil 1-3" станет:
-                Resident Evil 1
-                Resident Evil 2
-                Resident Evil 3
-
             sort_game (bool): сортировка игр
             sort_reverse (bool): направление сортировки
             show_only_categories (list): фильтр по категориям
+            filter_ignore_case (bool): фильтрация без учета регистра,
+                по умолчанию включена в Windows
         """
 
-        logger.debug("Start parsing")
+        logger.debug("Start filtering")
         t = time.perf_counter()
 
         logger.debug(f'filter_exp="{filter_exp}".')
 
-        # Для возможности поиска просто по словам:
-        if not filter_exp.endswith("*"):
-            filter_exp += "*"
-            logger.debug(f'Change filter_exp="{filter_exp}".')
+        selection = self.index.selection
+        if selection is not None and not selection.covers(
+            filter_exp, filter_ignore_case, show_only_categories
+        ):
+            raise ValueError(
+                f"Индекс построен с отбором {selection}, для этих фильтров "
+                "его нужно построить заново через build_index"
+            )
+
+        # Если фильтры не поменялись, а в индексе поменялись только некоторые платформы,
+        # то заново заполняются только они
+        state = (
+            self.index,
+            filter_exp,
+            sort_game,
+            sort_reverse,
+            tuple(show_only_categories),
+            filter_ignore_case,
+        )
+        changed_platforms = self.index.changed_platforms
+        self.index.changed_platforms = set()
+
+        if state == self._last_filter_state and changed_platforms is not None:
+            # Фильтрация, добавление и сортировка идут по платформам вперемешку
+            with measure(self.stats, STAGE_INSERT):
+                self._update_changed_platforms(
+                    changed_platforms,
+                    filter_exp,
+                    sort_game,
+                    sort_reverse,
+                    show_only_categories,
+                    filter_ignore_case,
+                )
+
+            if self.stats is not None:
+                self.stats.finish("apply_filter")
+
+            logger.debug(
+                f"Finish filtering. Changed platforms: {len(changed_platforms)}. "
+                f"Elapsed time: {time.perf_counter() - t:.3f} sec."
+            )
+            return
+
+        self._last_filter_state = state
 
         self.platforms.clear()
-        self.other.platforms.clear()
+        self._count_games = 0
+        self.other.clear()
+
+        with measure(self.stats, STAGE_FILTER):
+            # Записи отсеянных категорий не проверяются выражением
+            entries = self.index.filter(
+                filter_exp, filter_ignore_case, show_only_categories
+            )
+
+        with measure(self.stats, STAGE_INSERT, len(entries)):
+            # Платформы создаются в том порядке, в котором они встретились в тексте
+            for name_platform in self.index.platform_names:
+                self.get(name_platform)
+
+            for name_platform, kind, _, game_name in entries:
+                if kind == Parser.CategoryEnum.OTHER:
+                    self.other.add_game(name_platform, game_name)
+                else:
+                    self.get(name_platform).get(kind).add(game_name)
+
+        with measure(self.stats, STAGE_DELETE_EMPTY):
+            Parser.delete_empty_platforms(self.platforms)
+            Parser.delete_empty_platforms(self.other.platforms)
 
-        name_platform = None
+        if sort_game:
+            with measure(self.stats, STAGE_SORT):
+                # Сортировка игр
+                for platform in self.platforms.values():
+                    for category in platform.categories.values():
+                        category.sort_game_list(reverse=sort_reverse)
 
-        # Проходим в текст построчно
-        for line in text.split("\n"):
-            line = line.rstrip()
-            if not line:
-                continue
+                for platform in self.other.platforms.values():
+                    for category in platform.categories.values():
+                        category.sort_game_list(reverse=sort_reverse)
+
+        if self.stats is not None:
+            self.stats.finish("apply_filter")
 
-            # Определим игровую платформу: ПК, консоли и т.п.
-            if (
-                line[0] not in Parser.ALL_ATTRIBUTES_GAMES
-                and line[1] not in Parser.ALL_ATTRIBUTES_GAMES
-            ) and line.endswith(":"):
-                # Имя платформы без двоеточия на конце
-                name_platform = line[0 : len(line) - 1]
-                platform_item = self.get(name_platform)
+        logger.debug(
+            f"Finish filtering. Elapsed time: {time.perf_counter() - t:.3f} sec."
+        )
+
+    def _update_changed_platforms(
+        self,
+        changed_platforms,
+        filter_exp,
+        sort_game,
+        sort_reverse,
+        show_only_categories,
+        filter_ignore_case,
+    ):
+        """Функция заново заполняет только указанные платформы, объекты остальных
+        платформ переиспользуются. Порядок платформ будет таким же, как у apply_filter.
+
+        """
+
+        match = compile_filter(filter_exp, filter_ignore_case).match
+
+        platforms = {
+            name: p for name, p in self.platforms.items() if name not in changed_platforms
+        }
+        other_platforms = {
+            name: p
+            for name, p in self.other.platforms.items()
+            if name not in changed_platforms
+        }
+
+        for section in self.index.sections:
+            name_platform = section.platform
+            if name_platform not in changed_platforms:
                 continue
 
-            if name_platform:
-                # Первые 2 символа -- тэг игры: пройденная, не пройденная, просмотренная
-                attributes = line[0:2]
+            for _, kind, filter_name, game_name in section.entries:
+                if kind not in show_only_categories or not match(filter_name):
+                    continue
 
-                # Третий символ и до конца строки -- имя игры
-                game_name = line[2:]
-                game_name_list = (
-                    parse_game_name(game_name)
-                    if parse_game_name_on_sequence
-                    else [game_name]
-                )
+                if kind == Parser.CategoryEnum.OTHER:
+                    target, owner = other_platforms, self.other
+                else:
+                    target, owner = platforms, self
 
-                for game_name in game_name_list:
-                    # Фильтруем игры
-                    if not fnmatch.fnmatch(game_name, filter_exp):
+                platform = target.get(name_platform)
+                if platform is None:
+                    platform = Parser.Platform(name_platform, owner)
+                    target[name_platform] = platform
+
+                platform.get(kind).add(game_name)
+
+        if sort_game:
+            for name in changed_platforms:
+                for platform in (platforms.get(name), other_platforms.get(name)):
+                    if platform is None:
                         continue
 
-                    # Проверим на неизвестные атрибуты
-                    unknown_attributes = str(attributes)
-                    for c in Parser.ALL_ATTRIBUTES_GAMES:
-                        unknown_attributes = unknown_attributes.replace(c, "")
+                    for category in platform.categories.values():
+                        category.sort_game_list(reverse=sort_reverse)
+
+        # Платформы идут в порядке появления в тексте
+        self.platforms = {
+            name: platforms[name]
+            for name in self.index.platform_names
+            if name in platforms and platforms[name].count_games
+        }
+        self._count_games = sum(p.count_games for p in self.platforms.values())
+
+        # Платформы неопределенных игр идут в порядке первой подходящей неопределенной игры
+        first_section = dict()
+        for i, section in enumerate(self.index.sections):
+            name_platform = section.platform
+            if name_platform not in other_platforms or name_platform in first_section:
+                continue
 
-                    # Если строка не пуста, значит в ней есть неизвестные символы
-                    if unknown_attributes:
-                        # Добавляем, если нет, к неопределенным играм узел платформы или получаем платформу
-                        logger.warning(
-                            f"Обнаружен неизвестный атрибут: {unknown_attributes}, игра: {line}, платформа: {name_platform}."
-                        )
+            if any(match(filter_name) for _, _, filter_name, _ in section.other_entries):
+                first_section[name_platform] = i
 
-                        if Parser.CategoryEnum.OTHER in show_only_categories:
-                            self.other.add_game(name_platform, line)
-                        continue
+        self.other.platforms = {
+            name: other_platforms[name]
+            for name in sorted(first_section, key=first_section.get)
+            if other_platforms[name].count_games
+        }
+        self.other._count_games = sum(
+            p.count_games for p in self.other.platforms.values()
+        )
 
-                    is_finished_watched = attributes == "@ " or attributes == " @"
-                    is_not_finished_watched = attributes == "@-" or attributes == "-@"
-
-                    is_finished_game = attributes == "  "
-                    is_not_finished_game = attributes == "- " or attributes == " -"
-
-                    def add_game(category, game_name):
-                        # Фильтруем по типу категории
-                        if category in show_only_categories:
-                            platform_item.get(category).add(game_name)
-
-                    if is_finished_game:
-                        add_game(Parser.CategoryEnum.FINISHED_GAME, game_name)
-                    elif is_not_finished_game:
-                        add_game(Parser.CategoryEnum.NOT_FINISHED_GAME, game_name)
-                    elif is_finished_watched:
-                        add_game(Parser.CategoryEnum.FINISHED_WATCHED, game_name)
-                    elif is_not_finished_watched:
-                        add_game(Parser.CategoryEnum.NOT_FINISHED_WATCHED, game_name)
-                    else:
-                        if Parser.CategoryEnum.OTHER in show_only_categories:
-                            logger.warning(
-                                f"Неопределенная игра {line}, платформа: {name_platform}."
-                            )
-                            self.other.add_game(name_platform, game_name)
+    def build_columnar(
+        self,
+        filter_exp="",
+        sort_game=False,
+        sort_reverse=False,
+        show_only_categories=(
+            CategoryEnum.FINISHED_GAME,
+            CategoryEnum.NOT_FINISHED_GAME,
+            CategoryEnum.FINISHED_WATCHED,
+            CategoryEnum.NOT_FINISHED_WATCHED,
+            CategoryEnum.OTHER,
+        ),
+        filter_ignore_case=DEFAULT_FILTER_IGNORE_CASE,
+    ):
+        """Функция аналогична apply_filter, но игры не добавляются в платформы парсера,
+        а возвращаются в виде колоночного хранилища ColumnarResult.
+        Перед вызовом индекс должен быть построен через build_index.
 
-        Parser.delete_empty_platforms(self.platforms)
-        Parser.delete_empty_platforms(self.other.platforms)
+        """
 
-        if sort_game:
-            # который был заполнен при парсинге и производный от него -- отсортированный
-            # Сортировка игр
-            for platform in self.platforms.values():
-                for category in platform.categories.values():
-                    category.sort_game_list(reverse=sort_reverse)
+        return ColumnarResult.from_index(
+            self.index,
+            filter_exp,
+            sort_game,
+            sort_reverse,
+            show_only_categories,
+            filter_ignore_case,
+        )
 
-            for platform in self.other.platforms.values():
-                for category in platform.categories.values():
-                    category.sort_game_list(reverse=sort_reverse)
+    def parse(
+        self,
+        text,
+        filter_exp="",
+        parse_game_name_on_sequence=True,
+        sort_game=False,
+        sort_reverse=False,
+        show_only_categories=(
+            CategoryEnum.FINISHED_GAME,
+            CategoryEnum.NOT_FINISHED_GAME,
+            CategoryEnum.FINISHED_WATCHED,
+            CategoryEnum.NOT_FINISHED_WATCHED,
+            CategoryEnum.OTHER,
+        ),
+        filter_ignore_case=DEFAULT_FILTER_IGNORE_CASE,
+    ):
+        """Функция парсит строку игр.
 
-        logger.debug(
-            f"Finish parsing. Elapsed time: {time.perf_counter() - t:.3f} sec."
+        Args:
+            text (str | Iterable[str]): строка с играми или итерируемый объект строк,
+                например, открытый файл
+            filter_exp (str): wildcard выражение фильтрации игр
+            parse_game_name_on_sequence (bool): параметр определяет нужно ли в названиии
+                игры искать указание ее частей. Например,
+                "Resident Evil 4, 5, 6" станет:
+                Resident Evil 4
+                Resident Evil 5
+                Resident Evil 6
+
+                "Resident Evil 1-3" станет:
+                Resident Evil 1
+                Resident Evil 2
+                Resident Evil 3
+
+            sort_game (bool): сортировка игр
+            sort_reverse (bool): направление сортировки
+            show_only_categories (list): фильтр по категориям
+            filter_ignore_case (bool): фильтрация без учета регистра,
+                по умолчанию включена в Windows
+
+        Если у парсера есть статистика stats, то в ней останутся замеры только этого разбора.
+
+        Индекс строится только под эти фильтры: игры других категорий и части игр,
+        которые не подходят под начало выражения, в него не попадают. Для фильтрации
+        одного текста разными фильтрами индекс строится через build_index.
+        """
+
+        if self.stats is not None:
+            self.stats.clear()
+
+        # Игры, которые не пройдут фильтры, отсеиваются еще при построении индекса
+        selection = Parser.Index.Selection.create(
+            filter_exp, filter_ignore_case, show_only_categories
+        )
+        # Индекс разового разбора не обновляется, поэтому куски текста не нужны
+        self.build_index(
+            text, parse_game_name_on_sequence, selection=selection, keep_chunks=False
+        )
+        self.apply_filter(
+            filter_exp,
+            sort_game,
+            sort_reverse,
+            show_only_categories,
+            filter_ignore_case,
+        )
+
+    def parse_file(
+        self,
+        file_name,
+        filter_exp="",
+        parse_game_name_on_sequence=True,
+        sort_game=False,
+        sort_reverse=False,
+        show_only_categories=(
+            CategoryEnum.FINISHED_GAME,
+            CategoryEnum.NOT_FINISHED_GAME,
+            CategoryEnum.FINISHED_WATCHED,
+            CategoryEnum.NOT_FINISHED_WATCHED,
+            CategoryEnum.OTHER,
+        ),
+        filter_ignore_case=DEFAULT_FILTER_IGNORE_CASE,
+        encoding="utf-8",
+    ):
+        """Функция аналогична parse, но разбирает локальный файл без чтения его в память."""
+
+        if self.stats is not None:
+            self.stats.clear()
+
+        selection = Parser.Index.Selection.create(
+            filter_exp, filter_ignore_case, show_only_categories
+        )
+        self.build_index_from_file(
+            file_name, parse_game_name_on_sequence, encoding, selection
+        )
+        self.apply_filter(
+            filter_exp,
+            sort_game,
+            sort_reverse,
+            show_only_categories,
+            filter_ignore_case,
         )
 
     @property
@@ -452,10 +1473,15 @@ class Parser:
 
 
 if __name__ == "__main__":
-    text = open("gistfile1.txt", encoding="utf8").read()
+    from played_games_profile import ParseStats
 
     p = Parser()
-    p.parse(text)
+
+    # С ключом --profile после результата печатается время этапов разбора
+    if "--profile" in sys.argv:
+        p.stats = ParseStats()
+
+    p.parse_file("gistfile1.txt")
 
     indent = " " * 2
 
@@ -481,3 +1507,8 @@ if __name__ == "__main__":
         for category in v.categories.values():
             for game in category:
                 print(indent * 2 + game.name)
+
+    if p.stats is not None:
+        print()
+        print("Profile:")
+        print(p.stats.report())
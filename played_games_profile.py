@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Замеры времени по этапам разбора.
+
+Парсер замеряет этапы, только если ему передан объект ParseStats: без него код разбора
+остается прежним, а на каждую операцию добавляется лишь проверка на None. Этапы,
+которые выполняются для каждой строки или игры, замеряются через обертки wrap
+и wrap_iter, остальные -- через measure.
+
+"""
+
+__author__ = "ipetrash"
+
+
+import time
+
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterable, Iterator
+
+
+# Разбиение текста на разделы платформ
+STAGE_SPLIT_CHUNKS = "split chunks"
+
+# Разбиение текста на строки
+STAGE_SPLIT_LINES = "split lines"
+
+# Определение строк платформ и категорий игр по атрибутам, выполняются за один проход
+STAGE_EVENTS = "platforms and attributes"
+
+# Разбор частей в названиях игр: parse_game_name_sequence
+STAGE_SEQUENCE = "parse_game_name"
+
+# Добавление игр в индекс с отсевом дубликатов
+STAGE_INSERT_INDEX = "insert into index"
+
+# Отбор записей индекса по wildcard выражению
+STAGE_FILTER = "filter"
+
+# Добавление отобранных игр в платформы
+STAGE_INSERT = "insert into platforms"
+
+STAGE_DELETE_EMPTY = "delete empty platforms"
+
+STAGE_SORT = "sort"
+
+
+class ParseStats:
+    """
+    Класс статистики этапов разбора: время и количество вызовов или обработанных
+    элементов по каждому этапу.
+
+    Статистика накапливается, пока ее не очистят через clear. После каждой операции
+    парсера (построение индекса, фильтрация) вызывается hook(операция, статистика).
+
+    """
+
+    class Stage:
+        __slots__ = ("name", "elapsed", "count")
+
+        def __init__(self, name):
+            self.name = name
+            self.elapsed = 0.0
+            self.count = 0
+
+        def __str__(self):
+            return f"{self.name}: {self.elapsed:.3f} sec, count: {self.count}"
+
+        def __repr__(self):
+            return self.__str__()
+
+    def __init__(self, hook: Callable[[str, "ParseStats"], None] | None = None):
+        self.hook = hook
+
+        # Этапы в порядке первого замера
+        self.stages: dict[str, ParseStats.Stage] = dict()
+
+    def get(self, name: str) -> Stage:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = ParseStats.Stage(name)
+            self.stages[name] = stage
+
+        return stage
+
+    def add(self, name: str, elapsed: float, count: int = 1):
+        stage = self.get(name)
+        stage.elapsed += elapsed
+        stage.count += count
+
+    @contextmanager
+    def measure(self, name: str, count: int = 1, exclude: Iterable[str] = ()):
+        """Замер блока кода. Время этапов из exclude, замеренных внутри блока,
+        из времени блока вычитается.
+
+        """
+
+        exclude = [self.get(stage_name) for stage_name in exclude]
+        excluded = sum(stage.elapsed for stage in exclude)
+
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t
+            elapsed -= sum(stage.elapsed for stage in exclude) - excluded
+            self.add(name, elapsed, count)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """Функция возвращает обертку над func, которая замеряет каждый ее вызов."""
+
+        stage = self.get(name)
+        perf_counter = time.perf_counter
+
+        def wrapper(*args):
+            t = perf_counter()
+            try:
+                return func(*args)
+            finally:
+                stage.elapsed += perf_counter() - t
+                stage.count += 1
+
+        return wrapper
+
+    def wrap_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """Функция возвращает итератор по iterable, который замеряет получение
+        каждого элемента.
+
+        """
+
+        stage = self.get(name)
+        perf_counter = time.perf_counter
+        it = iter(iterable)
+
+        while True:
+            t = perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                stage.elapsed += perf_counter() - t
+                return
+
+            stage.elapsed += perf_counter() - t
+            stage.count += 1
+
+            yield item
+
+    def finish(self, operation: str):
+        if self.hook:
+            self.hook(operation, self)
+
+    def clear(self):
+        self.stages.clear()
+
+    @property
+    def total(self) -> float:
+        return sum(stage.elapsed for stage in self.stages.values())
+
+    def report(self) -> str:
+        """Функция возвращает таблицу этапов, отсортированных по убыванию времени."""
+
+        total = self.total or 1.0
+
+        lines = []
+        for stage in sorted(self.stages.values(), key=lambda x: -x.elapsed):
+            lines.append(
+                f"{stage.name:<25} {stage.elapsed:8.3f} sec "
+                f"{stage.elapsed / total:6.1%} {stage.count:>10}"
+            )
+
+        lines.append(f"{'total':<25} {self.total:8.3f} sec")
+        return "\n".join(lines)
+
+    def __str__(self):
+        return f"ParseStats(total={self.total:.3f} sec, stages={len(self.stages)})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def measure(stats: ParseStats | None, name: str, count: int = 1, exclude=()):
+    """Функция возвращает замер блока кода, а если статистика не собирается,
+    то пустой контекст.
+
+    """
+
+    if stats is None:
+        return nullcontext()
+
+    return stats.measure(name, count, exclude)
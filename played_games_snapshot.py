@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Снимок разобранного индекса на диске для быстрого запуска.
+
+Индекс Parser.Index сохраняется столбцами: имена платформ разделов, количество записей
+в разделах, значения категорий и названия игр. Замечания к тексту сохраняются вместе
+с индексом, чтобы их сводку можно было показать без разбора.
+
+Снимок привязан к хешу разобранного текста и к параметру parse_game_name_on_sequence,
+поэтому при запуске можно сразу показать последний результат, а после загрузки текста
+проверить, что он не поменялся.
+
+Сортировка и фильтры применяются к индексу уже после загрузки, поэтому в ключ снимка
+не входят.
+
+"""
+
+__author__ = "ipetrash"
+
+
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import tempfile
+import zlib
+
+from array import array
+from itertools import repeat
+
+from played_games_columnar import CATEGORIES
+from played_games_parser import Parser, logger
+from played_games_stream import Diagnostic, DiagnosticKind, Diagnostics
+
+
+SNAPSHOT_DIR = "snapshots"
+
+# При изменении формата снимка версию нужно увеличить, старые снимки будут пропущены
+FORMAT_VERSION = 4
+
+MAGIC = b"PGSNAP"
+
+# Заголовок: MAGIC, версия формата и версия marshal, которым сохранены данные
+HEADER = struct.Struct(f"<{len(MAGIC)}sHH")
+
+
+def get_text_hash(text: str | bytes) -> str:
+    if isinstance(text, str):
+        text = text.encode("utf-8", "surrogatepass")
+
+    return hashlib.blake2b(text, digest_size=16).hexdigest()
+
+
+def get_file_hash(file_name: str) -> str:
+    """Функция считает хеш файла, аналогичный get_text_hash, не читая файл целиком."""
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_name, "rb") as f:
+        while block := f.read(1024 * 1024):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def get_snapshot_file_name(source: str, dir_name: str = SNAPSHOT_DIR) -> str:
+    """Функция возвращает путь к снимку для источника текста: ссылки или пути к файлу."""
+
+    key = hashlib.sha1(source.encode("utf-8")).hexdigest()
+    return os.path.join(dir_name, key + ".snapshot")
+
+
+def dump_diagnostics(diagnostics: Diagnostics) -> tuple:
+    """Функция раскладывает замечания по значениям, которые умеет сохранять marshal."""
+
+    return (
+        diagnostics.max_examples,
+        [(kind.value, count) for kind, count in diagnostics.counts.items()],
+        [
+            (
+                d.kind.value,
+                d.platform,
+                d.game,
+                d.line_number,
+                None if d.category is None else d.category.value,
+            )
+            for d in diagnostics.records
+        ],
+    )
+
+
+def load_diagnostics(data: tuple) -> Diagnostics:
+    max_examples, counts, records = data
+
+    diagnostics = Diagnostics(max_examples)
+    for kind_value, count in counts:
+        diagnostics.counts[DiagnosticKind(kind_value)] = count
+
+    for kind_value, platform, game, line_number, category_value in records:
+        category = None
+        if category_value is not None:
+            category = CATEGORIES[category_value]
+
+        diagnostics.records.append(
+            Diagnostic(
+                DiagnosticKind(kind_value), platform, game, line_number, category
+            )
+        )
+
+    return diagnostics
+
+
+def dump_index(index: Parser.Index) -> dict:
+    """Функция раскладывает индекс по столбцам."""
+
+    # В индексе с отбором (Parser.parse) есть не все игры текста
+    if index.selection is not None:
+        raise ValueError("Снимок можно сохранить только для индекса без отбора")
+
+    platform_id_by_name = dict()
+    section_platform_ids = array("I")
+    section_sizes = array("I")
+    category_values = array("B")
+    filter_names = []
+
+    # Название игры отличается от имени для фильтра только у игр с неизвестными
+    # атрибутами, поэтому хранятся только такие названия
+    game_names = dict()
+
+    for section in index.sections:
+        platform_id = platform_id_by_name.setdefault(
+            section.platform, len(platform_id_by_name)
+        )
+        section_platform_ids.append(platform_id)
+        section_sizes.append(len(section.entries))
+
+        for _, kind, filter_name, game_name in section.entries:
+            if filter_name != game_name:
+                game_names[len(filter_names)] = game_name
+
+            category_values.append(kind.value)
+            filter_names.append(filter_name)
+
+    # Разделы по кускам текста нужны, чтобы потом обновить индекс через update
+    chunk_digests = b"".join(digest for digest, *_ in index._chunks)
+    chunk_sizes = array("I", (len(sections) for _, sections, *_ in index._chunks))
+    chunk_diagnostics = [
+        dump_diagnostics(diagnostics) for _, _, diagnostics, _ in index._chunks
+    ]
+    chunk_line_numbers = array("I", (line_number for *_, line_number in index._chunks))
+
+    return {
+        "parse_game_name_on_sequence": index.parse_game_name_on_sequence,
+        "platform_names": list(platform_id_by_name),
+        "section_platform_ids": section_platform_ids.tobytes(),
+        "section_sizes": section_sizes.tobytes(),
+        "category_values": category_values.tobytes(),
+        "filter_names": filter_names,
+        "game_names": game_names,
+        "chunk_digests": chunk_digests,
+        "chunk_sizes": chunk_sizes.tobytes(),
+        "chunk_diagnostics": chunk_diagnostics,
+        "chunk_line_numbers": chunk_line_numbers.tobytes(),
+        "diagnostics": dump_diagnostics(index.diagnostics),
+    }
+
+
+def load_index(data: dict) -> Parser.Index:
+    """Функция собирает индекс из столбцов, полученных из dump_index."""
+
+    index = Parser.Index(data["parse_game_name_on_sequence"])
+
+    platform_names = data["platform_names"]
+    section_platform_ids = array("I", data["section_platform_ids"])
+    section_sizes = array("I", data["section_sizes"])
+    category_values = data["category_values"]
+    categories = list(map(CATEGORIES.__getitem__, category_values))
+    other_value = Parser.CategoryEnum.OTHER.value
+    filter_names = list(map(sys.intern, data["filter_names"]))
+
+    game_names = filter_names
+    if data["game_names"]:
+        game_names = list(filter_names)
+        for i, game_name in data["game_names"].items():
+            game_names[i] = game_name
+
+    sections = []
+    start = 0
+    for platform_id, size in zip(section_platform_ids, section_sizes):
+        stop = start + size
+
+        platform = platform_names[platform_id]
+        section = Parser.Index.Section(platform)
+        section.entries = list(
+            zip(
+                repeat(platform, size),
+                categories[start:stop],
+                filter_names[start:stop],
+                game_names[start:stop],
+            )
+        )
+        # Неопределенные игры редки, поэтому сначала проверяется, что они вообще есть
+        if other_value in category_values[start:stop]:
+            section.other_entries = [
+                entry
+                for entry in section.entries
+                if entry[1] == Parser.CategoryEnum.OTHER
+            ]
+
+        sections.append(section)
+
+        start = stop
+
+    chunk_digests = data["chunk_digests"]
+    chunk_diagnostics = data["chunk_diagnostics"]
+    chunk_line_numbers = array("I", data["chunk_line_numbers"])
+    start = 0
+    for i, size in enumerate(array("I", data["chunk_sizes"])):
+        digest = chunk_digests[i * 16 : (i + 1) * 16]
+        index._chunks.append(
+            (
+                digest,
+                sections[start : start + size],
+                load_diagnostics(chunk_diagnostics[i]),
+                chunk_line_numbers[i],
+            )
+        )
+        start += size
+
+    # Замечания индекса, построенного из файла, по кускам не собрать, поэтому
+    # они берутся из снимка целиком
+    index._set_sections(sections, Diagnostics())
+    index.diagnostics = load_diagnostics(data["diagnostics"])
+    return index
+
+
+def save_snapshot(file_name: str, index: Parser.Index, text_hash: str):
+    """Функция сохраняет снимок индекса, разобранного из текста с хешем text_hash."""
+
+    data = dump_index(index)
+    data["text_hash"] = text_hash
+
+    dir_name = os.path.dirname(file_name)
+    if dir_name:
+        os.makedirs(dir_name, exist_ok=True)
+
+    # Запись через временный файл, чтобы не оставить половину снимка. Имя у временного
+    # файла свое у каждой записи, чтобы одновременные записи не перемешались
+    f = tempfile.NamedTemporaryFile(
+        dir=dir_name or os.curdir,
+        prefix=os.path.basename(file_name) + ".",
+        suffix=".tmp",
+        delete=False,
+    )
+    try:
+        with f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version))
+            f.write(zlib.compress(marshal.dumps(data), 1))
+
+        os.replace(f.name, file_name)
+
+    except BaseException:
+        try:
+            os.remove(f.name)
+        except OSError:
+            pass
+
+        raise
+
+
+def load_snapshot(
+    file_name: str,
+    parse_game_name_on_sequence: bool = True,
+    text_hash: str | None = None,
+) -> tuple[str, Parser.Index] | None:
+    """Функция загружает снимок и возвращает хеш разобранного текста и индекс.
+
+    Если снимка нет, он другой версии, поврежден или сделан с другими параметрами
+    разбора, то вернется None. Если передан text_hash, то снимок должен быть сделан
+    по тексту с этим хешем.
+
+    """
+
+    try:
+        with open(file_name, "rb") as f:
+            header = f.read(HEADER.size)
+            if header != HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version):
+                logger.debug(f"Snapshot {file_name} has other format, skipped.")
+                return None
+
+            data = marshal.loads(zlib.decompress(f.read()))
+
+    except FileNotFoundError:
+        return None
+
+    except Exception as e:
+        logger.warning(f"Не удалось прочитать снимок {file_name}: {e}")
+        return None
+
+    if data["parse_game_name_on_sequence"] != parse_game_name_on_sequence:
+        return None
+
+    if text_hash is not None and data["text_hash"] != text_hash:
+        return None
+
+    return data["text_hash"], load_index(data)
+
+
+if __name__ == "__main__":
+    logger.disabled = True
+
+    print("Tests")
+
+    def _dump(index):
+        return (
+            index.platform_names,
+            [(s.platform, s.entries, s.other_entries) for s in index.sections],
+            index.entries,
+            index._chunks
+            and [(d, len(s), e.records, n) for d, s, e, n in index._chunks],
+            index.diagnostics.counts,
+            index.diagnostics.records,
+        )
+
+    with open("gistfile1.txt", encoding="utf-8") as f:
+        text = f.read()
+
+    # Неизвестный атрибут: имя для фильтра и название игры разные
+    text += "\nPC:\n  Foo\n?-Bar 1-3\n"
+
+    with tempfile.TemporaryDirectory() as dir_name:
+        file_name = get_snapshot_file_name("gistfile1.txt", dir_name)
+        text_hash = get_text_hash(text)
+
+        for parse_game_name_on_sequence in (True, False):
+            p = Parser()
+            p.build_index(text, parse_game_name_on_sequence)
+            save_snapshot(file_name, p.index, text_hash)
+
+            loaded_hash, index = load_snapshot(
+                file_name, parse_game_name_on_sequence, text_hash
+            )
+            assert loaded_hash == text_hash
+            assert _dump(index) == _dump(p.index)
+
+            assert not load_snapshot(file_name, not parse_game_name_on_sequence)
+            assert not load_snapshot(
+                file_name, parse_game_name_on_sequence, get_text_hash("")
+            )
+
+            # По загруженному индексу работает обновление изменившихся платформ
+            new_text = text.replace("PS:", "PS:\n  New Game", 1)
+            index.update(new_text)
+            assert index.changed_platforms is None
+            p.build_index(new_text, parse_game_name_on_sequence)
+            assert _dump(index) == _dump(p.index)
+
+        # Снимок индекса, построенного из файла
+        p = Parser()
+        p.build_index_from_file("gistfile1.txt")
+        save_snapshot(file_name, p.index, get_file_hash("gistfile1.txt"))
+        with open("gistfile1.txt", "rb") as f:
+            assert get_file_hash("gistfile1.txt") == get_text_hash(f.read())
+
+        _, index = load_snapshot(file_name)
+        assert _dump(index) == _dump(p.index)
+
+        # Временные файлы после записи не остаются
+        assert os.listdir(dir_name) == [os.path.basename(file_name)]
+
+        # Снимок другой версии формата пропускается
+        with open(file_name, "r+b") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION + 1, marshal.version))
+        assert load_snapshot(file_name) is None
+
+        with open(file_name, "wb") as f:
+            f.write(b"broken")
+        assert load_snapshot(file_name) is None
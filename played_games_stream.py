@@ -0,0 +1,676 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Потоковый разбор формата списка игр.
+
+Строки читаются по одной из любого итерируемого объекта (открытый файл, ответ сервера,
+список строк), а результат возвращается в виде событий: начало платформы, игра с категорией
+и диагностическое сообщение. На этих событиях построены парсеры played_games_parser
+и mini_played_games_parser.
+
+Локальный файл можно разобрать без чтения в память: он отображается через mmap,
+а строки разбираются на уровне байтов.
+
+Разделы платформ не зависят друг от друга, поэтому большой текст можно разбить
+на куски по заголовкам платформ и разобрать их параллельно в пуле процессов.
+
+Замечания к тексту парсеры собирают в Diagnostics: записи хранят вид замечания,
+платформу, номер строки и игру, а текст сообщения формируется только при выводе.
+
+Части игры из названия вида "Foo 1-3" парсеры разбирают в GameNameSequence
+(parse_game_name_sequence): названия частей создаются только при обращении к ним,
+а размер диапазона известен сразу. Функции parse_game_name возвращают список.
+
+"""
+
+__author__ = "ipetrash"
+
+
+import mmap
+import os
+import re
+
+from collections import Counter
+from collections.abc import Sequence
+from enum import Enum
+from itertools import chain, product, repeat
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+
+class CategoryEnum(Enum):
+    """Перечисление видов категории."""
+
+    # Четыре ниже используется для идентификации игр и платформ
+    # OTHER -- только для идентифакации игр, т.к. у неопределенных игр нет категорий
+    FINISHED_GAME = 0
+    NOT_FINISHED_GAME = 1
+    FINISHED_WATCHED = 2
+    NOT_FINISHED_WATCHED = 3
+    OTHER = 4
+
+    def __str__(self):
+        return f"{self.name}"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class DiagnosticKind(Enum):
+    """Перечисление видов диагностических сообщений."""
+
+    # В атрибутах игры есть символы, кроме ALL_ATTRIBUTES_GAMES
+    UNKNOWN_ATTRIBUTE = 0
+
+    # Атрибуты из известных символов, но такого их сочетания нет
+    UNDEFINED_GAME = 1
+
+    # Игра уже есть в этой категории платформы
+    DUPLICATE_GAME = 2
+
+    # Игра есть и в пройденных, и в не пройденных (или в просмотренных
+    # и не просмотренных). В category -- не законченная категория
+    CONFLICTING_CATEGORIES = 3
+
+    # Частей в названии игры больше MAX_GAME_NAME_SEQUENCE_SIZE, название
+    # добавлено целиком, без разбора на части
+    SEQUENCE_TOO_LONG = 4
+
+    def __str__(self):
+        return f"{self.name}"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+ALL_ATTRIBUTES_GAMES = " -@"
+
+# Атрибуты игры и соответствующие им категории
+CATEGORY_BY_ATTRIBUTES: dict[str, CategoryEnum] = {
+    "  ": CategoryEnum.FINISHED_GAME,
+    "- ": CategoryEnum.NOT_FINISHED_GAME,
+    " -": CategoryEnum.NOT_FINISHED_GAME,
+    "@ ": CategoryEnum.FINISHED_WATCHED,
+    " @": CategoryEnum.FINISHED_WATCHED,
+    "@-": CategoryEnum.NOT_FINISHED_WATCHED,
+    "-@": CategoryEnum.NOT_FINISHED_WATCHED,
+}
+
+# Сколько разных первых двух символов строк хранит таблица LINE_PREFIXES
+LINE_PREFIXES_MAX_SIZE = 64 * 1024
+
+# Строка заголовка платформы, аналогично правилу таблицы LINE_PREFIXES
+PLATFORM_LINE_PATTERN = re.compile(
+    r"^(?![ \-@])(?!.[ \-@]).*:[^\S\n]*$", flags=re.MULTILINE
+)
+
+# Границы строк str.splitlines, кроме "\n" и "\r\n"
+OTHER_LINE_BOUNDARY_PATTERN = re.compile(
+    r"\r(?!\n)|[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]"
+)
+
+# Все границы строк str.splitlines
+LINE_BOUNDARY_PATTERN = re.compile(
+    r"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]"
+)
+
+# Фильтрация по умолчанию без учета регистра в Windows: раньше игры фильтровались
+# через fnmatch.fnmatch, который там приводит названия к нижнему регистру
+DEFAULT_FILTER_IGNORE_CASE = os.name == "nt"
+
+# Сколько записей каждого вида по умолчанию хранит Diagnostics, остальные только считаются
+DIAGNOSTICS_MAX_EXAMPLES = 100
+
+# Сколько частей игры можно получить из одного названия. Скорее всего, больше -- это
+# опечатка, например, "Foo 1-999999", и создавать столько игр не нужно
+MAX_GAME_NAME_SEQUENCE_SIZE = 1000
+
+# Тексты меньшего размера разбираются в текущем процессе: запуск пула и передача
+# данных между процессами обойдутся дороже самого разбора
+PARALLEL_MIN_TEXT_SIZE = 1024 * 1024
+
+# Минимальный размер пачки кусков текста, отправляемой в процесс
+PARALLEL_MIN_BATCH_SIZE = 64 * 1024
+
+
+class PlatformEvent(NamedTuple):
+    """Событие начала платформы."""
+
+    name: str
+    line_number: int
+
+
+class GameEvent(NamedTuple):
+    """Событие игры. Название игры не разбирается на части, это делают сами парсеры.
+    У игр со странными атрибутами категория OTHER.
+
+    """
+
+    platform: str
+    category: CategoryEnum
+    attributes: str
+    name: str
+    line_number: int
+
+    @property
+    def line(self) -> str:
+        return self.attributes + self.name
+
+
+class DiagnosticEvent(NamedTuple):
+    """Событие с диагностическим сообщением. Идет перед событием игры, к которой относится."""
+
+    kind: DiagnosticKind
+    platform: str
+    line: str
+    line_number: int
+
+
+class Diagnostic(NamedTuple):
+    """Замечание к тексту. В game -- название игры, а для строк странного формата
+    -- вся строка.
+
+    """
+
+    kind: DiagnosticKind
+    platform: str
+    game: str
+    line_number: int | None = None
+    category: CategoryEnum | None = None
+
+    def __str__(self):
+        if self.kind == DiagnosticKind.UNKNOWN_ATTRIBUTE:
+            unknown_attributes = "".join(
+                c for c in self.game[:2] if c not in ALL_ATTRIBUTES_GAMES
+            )
+            return f"Обнаружен неизвестный атрибут: {unknown_attributes}, игра: {self.game}, платформа: {self.platform}."
+
+        if self.kind == DiagnosticKind.UNDEFINED_GAME:
+            return f"Неопределенная игра {self.game}, платформа: {self.platform}."
+
+        if self.kind == DiagnosticKind.DUPLICATE_GAME:
+            return f'Предотвращено добавление дубликата игры "{self.game}" в категорию {self.category}.'
+
+        if self.kind == DiagnosticKind.SEQUENCE_TOO_LONG:
+            return (
+                f'Частей в названии игры "{self.game}" больше {MAX_GAME_NAME_SEQUENCE_SIZE}, '
+                f"игра добавлена без разбора на части, платформа: {self.platform}."
+            )
+
+        if self.category == CategoryEnum.NOT_FINISHED_WATCHED:
+            return f'Игра "{self.game}" ({self.platform}) присутствует и в не просмотренных, и в просмотренных'
+
+        return f'Игра "{self.game}" ({self.platform}) присутствует и в не пройденных, и в пройденных'
+
+
+class GameNameSequence(Sequence):
+    """Ленивая последовательность названий частей игры.
+
+    Хранит базовое название и номера частей: список строк или range для диапазона.
+    Названия создаются при обращении, поэтому размер диапазона вида "Foo 1-999999"
+    можно проверить до того, как будет создан миллион строк.
+
+    Пример:
+        GameNameSequence("Resident Evil", range(1, 4)) -> "Resident Evil", "Resident Evil 2", "Resident Evil 3"
+
+    """
+
+    __slots__ = ("base_name", "numbers")
+
+    def __init__(self, base_name: str, numbers: Sequence):
+        self.base_name = base_name
+        self.numbers = numbers
+
+    def _get_name(self, number) -> str:
+        number = str(number)
+
+        # Если игра первая в серии, то номер в названии не указывается
+        return self.base_name if number == "1" else self.base_name + " " + number
+
+    def may_start_with(self, prefix: str, ignore_case: bool = False) -> bool:
+        """Функция по базовому названию проверяет, может ли хоть одно название
+        начинаться с prefix. Сами названия не создаются.
+
+        """
+
+        base_name = self.base_name.lower() if ignore_case else self.base_name
+        if len(prefix) <= len(base_name):
+            return base_name.startswith(prefix)
+
+        # Префикс длиннее базового названия, значит, он захватывает номер части
+        return prefix.startswith(base_name + " ")
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return GameNameSequence(self.base_name, self.numbers[index])
+
+        return self._get_name(self.numbers[index])
+
+    def __iter__(self) -> Iterator[str]:
+        for number in self.numbers:
+            yield self._get_name(number)
+
+    def __str__(self):
+        return f"GameNameSequence({self.base_name!r}, {self.numbers!r})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Diagnostics:
+    """Сборщик замечаний к тексту.
+
+    Считает замечания каждого вида, а сами записи хранит не больше max_examples
+    на вид (None -- без ограничения), в порядке добавления.
+
+    """
+
+    def __init__(self, max_examples: int | None = DIAGNOSTICS_MAX_EXAMPLES):
+        self.max_examples = max_examples
+        self.counts: Counter[DiagnosticKind] = Counter()
+        self.records: list[Diagnostic] = []
+
+    def add(self, diagnostic: Diagnostic):
+        count = self.counts[diagnostic.kind]
+        self.counts[diagnostic.kind] = count + 1
+
+        if self.max_examples is None or count < self.max_examples:
+            self.records.append(diagnostic)
+
+    def merge(self, other: "Diagnostics"):
+        """Добавление замечаний другого сборщика, например, разобранного куска текста."""
+
+        stored_counts = Counter()
+        for diagnostic in other.records:
+            stored_counts[diagnostic.kind] += 1
+            self.add(diagnostic)
+
+        # Замечания, записи которых в other не сохранились, только считаются
+        for kind, count in other.counts.items():
+            self.counts[kind] += count - stored_counts[kind]
+
+    def shift_line_numbers(self, offset: int) -> "Diagnostics":
+        """Функция возвращает копию с номерами строк, сдвинутыми на offset.
+        Нужна, когда кусок текста без изменений переехал на другие строки.
+
+        """
+
+        diagnostics = Diagnostics(self.max_examples)
+        diagnostics.counts = self.counts.copy()
+        diagnostics.records = [
+            d
+            if d.line_number is None
+            else d._replace(line_number=d.line_number + offset)
+            for d in self.records
+        ]
+        return diagnostics
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> str:
+        return ", ".join(f"{kind}: {count}" for kind, count in self.counts.items())
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self) -> Iterator[Diagnostic]:
+        return iter(self.records)
+
+    def __str__(self):
+        return f"Diagnostics({self.summary()})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class LinePrefix(NamedTuple):
+    """Разбор строки по ее первым двум символам.
+
+    Для атрибутов известной игры diagnostic_kind -- None, иначе категория OTHER,
+    а в diagnostic_kind вид замечания. Может ли строка с такими первыми символами
+    и двоеточием на конце быть заголовком платформы (may_be_platform), определяет
+    таблица разбора строк парсера.
+
+    """
+
+    category: CategoryEnum
+    diagnostic_kind: DiagnosticKind | None
+    may_be_platform: bool
+
+
+def _classify_line_prefix(prefix: str) -> LinePrefix:
+    category = CATEGORY_BY_ATTRIBUTES.get(prefix)
+    if category is not None:
+        return LinePrefix(category, None, False)
+
+    if any(c not in ALL_ATTRIBUTES_GAMES for c in prefix):
+        diagnostic_kind = DiagnosticKind.UNKNOWN_ATTRIBUTE
+    else:
+        diagnostic_kind = DiagnosticKind.UNDEFINED_GAME
+
+    may_be_platform = not any(c in ALL_ATTRIBUTES_GAMES for c in prefix)
+    return LinePrefix(CategoryEnum.OTHER, diagnostic_kind, may_be_platform)
+
+
+class LinePrefixTable(dict):
+    """
+    Таблица разбора строк по первым двум символам: первые символы -> LinePrefix.
+
+    Заранее заполнена для всех сочетаний символов атрибутов, остальные первые символы
+    строк (названия платформ, строки странного формата) разбираются функцией classify
+    при первой встрече и запоминаются, пока в таблице меньше LINE_PREFIXES_MAX_SIZE
+    записей. В bytes хранится то же для разбора байтов: первые символы в байтах ->
+    (атрибуты, разбор).
+
+    """
+
+    def __init__(self, classify: Callable[[str], LinePrefix]):
+        super().__init__()
+
+        self.classify = classify
+        self.bytes: dict[bytes, tuple[str, LinePrefix]] = dict()
+
+        pairs = product(ALL_ATTRIBUTES_GAMES, repeat=2)
+        for prefix in map("".join, chain(pairs, ALL_ATTRIBUTES_GAMES)):
+            line_prefix = classify(prefix)
+            self[prefix] = line_prefix
+            self.bytes[prefix.encode()] = prefix, line_prefix
+
+    def __missing__(self, prefix: str) -> LinePrefix:
+        line_prefix = self.classify(prefix)
+        if len(self) < LINE_PREFIXES_MAX_SIZE:
+            self[prefix] = line_prefix
+
+        return line_prefix
+
+    def get_bytes(self, prefix: bytes) -> tuple[str, LinePrefix]:
+        value = self.bytes.get(prefix)
+        if value is None:
+            # Сюда попадают только ASCII символы
+            attributes = prefix.decode("ascii")
+            value = attributes, self[attributes]
+            if len(self.bytes) < LINE_PREFIXES_MAX_SIZE:
+                self.bytes[prefix] = value
+
+        return value
+
+
+# Таблица разбора строк played_games_parser: строка с двоеточием на конце -- заголовок
+# платформы, если в ее первых двух символах нет символов атрибутов
+LINE_PREFIXES = LinePrefixTable(_classify_line_prefix)
+
+
+def get_line_prefix(prefix: str) -> LinePrefix:
+    """Функция возвращает разбор строки по ее первым двум символам из LINE_PREFIXES."""
+
+    return LINE_PREFIXES[prefix]
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """
+    Функция возвращает строки текста по одной, не создавая список всех строк.
+
+    """
+
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+
+        yield text[start:end]
+        start = end + 1
+
+
+def iter_splitlines(text: str) -> Iterator[str]:
+    """
+    Функция аналогична iter_lines, но делит текст по границам строк str.splitlines.
+
+    Если в тексте из границ строк только "\n" и "\r\n", то строки делятся по "\n",
+    а "\r" на конце строки остается, его убирает rstrip при разборе строки.
+
+    """
+
+    if not OTHER_LINE_BOUNDARY_PATTERN.search(text):
+        yield from iter_lines(text)
+        return
+
+    start = 0
+    for m in LINE_BOUNDARY_PATTERN.finditer(text):
+        yield text[start : m.start()]
+        start = m.end()
+
+    if start < len(text):
+        yield text[start:]
+
+
+def iter_parse_events(
+    lines: Iterable[str],
+    start: int = 1,
+    line_prefixes: LinePrefixTable = LINE_PREFIXES,
+) -> Iterator[PlatformEvent | GameEvent | DiagnosticEvent]:
+    """
+    Функция лениво разбирает строки списка игр и возвращает события разбора.
+
+    Строки до первой платформы пропускаются. Параметр start задает номер первой строки,
+    это нужно при разборе куска текста. В line_prefixes передается таблица разбора строк
+    со своим правилом заголовка платформы.
+
+    """
+
+    platform = None
+
+    for line_number, line in enumerate(lines, start=start):
+        line = line.rstrip()
+        if not line:
+            continue
+
+        # Первые 2 символа -- тэг игры: пройденная, не пройденная, просмотренная,
+        # а по ним за один поиск в таблице определяется и заголовок платформы
+        attributes = line[:2]
+        line_prefix = line_prefixes[attributes]
+
+        # Определим игровую платформу: ПК, консоли и т.п.
+        if line_prefix.may_be_platform and line.endswith(":"):
+            # Имя платформы без двоеточия на конце
+            platform = line[:-1]
+            yield PlatformEvent(platform, line_number)
+            continue
+
+        if platform is None:
+            continue
+
+        if line_prefix.diagnostic_kind is not None:
+            yield DiagnosticEvent(
+                line_prefix.diagnostic_kind, platform, line, line_number
+            )
+
+        # Третий символ и до конца строки -- имя игры
+        yield GameEvent(
+            platform, line_prefix.category, attributes, line[2:], line_number
+        )
+
+
+def _is_ascii_byte(c: int) -> bool:
+    # Управляющие символы str.rstrip считает пробельными, а bytes.rstrip -- нет
+    return 0x20 <= c <= 0x7F
+
+
+def iter_parse_events_from_file(
+    file_name: str,
+    encoding: str = "utf-8",
+    line_prefixes: LinePrefixTable = LINE_PREFIXES,
+) -> Iterator[PlatformEvent | GameEvent | DiagnosticEvent]:
+    """
+    Функция лениво разбирает файл со списком игр, аналогично iter_parse_events.
+
+    Файл отображается в память через mmap, границы строк ищутся по байтам, а атрибуты
+    определяются без декодирования. Декодируются только имена платформ и игр.
+
+    """
+
+    with open(file_name, "rb") as f:
+        # Пустой файл нельзя отобразить в память
+        if not os.fstat(f.fileno()).st_size:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            platform = None
+
+            size = len(data)
+            start = 0
+            line_number = 0
+
+            while start < size:
+                end = data.find(b"\n", start)
+                if end == -1:
+                    end = size
+
+                line = data[start:end].rstrip()
+                start = end + 1
+                line_number += 1
+
+                if not line:
+                    continue
+
+                # Если в атрибутах или в конце строки есть не ASCII символы,
+                # то строку проще раскодировать и разобрать целиком
+                if not (
+                    _is_ascii_byte(line[0])
+                    and _is_ascii_byte(line[-1])
+                    and (len(line) == 1 or _is_ascii_byte(line[1]))
+                ):
+                    line = line.decode(encoding).rstrip()
+                    if not line:
+                        continue
+
+                    attributes = line[:2]
+                    line_prefix = line_prefixes[attributes]
+
+                    if line_prefix.may_be_platform and line.endswith(":"):
+                        platform = line[:-1]
+                        yield PlatformEvent(platform, line_number)
+                        continue
+
+                    if platform is None:
+                        continue
+
+                    if line_prefix.diagnostic_kind is not None:
+                        yield DiagnosticEvent(
+                            line_prefix.diagnostic_kind, platform, line, line_number
+                        )
+
+                    yield GameEvent(
+                        platform, line_prefix.category, attributes, line[2:], line_number
+                    )
+                    continue
+
+                attributes, line_prefix = line_prefixes.get_bytes(line[:2])
+
+                if line_prefix.may_be_platform and line.endswith(b":"):
+                    platform = line[:-1].decode(encoding)
+                    yield PlatformEvent(platform, line_number)
+                    continue
+
+                if platform is None:
+                    continue
+
+                if line_prefix.diagnostic_kind is not None:
+                    yield DiagnosticEvent(
+                        line_prefix.diagnostic_kind,
+                        platform,
+                        line.decode(encoding),
+                        line_number,
+                    )
+
+                yield GameEvent(
+                    platform,
+                    line_prefix.category,
+                    attributes,
+                    line[2:].decode(encoding),
+                    line_number,
+                )
+
+
+def iter_platform_chunks(
+    text: str,
+    pattern: re.Pattern = PLATFORM_LINE_PATTERN,
+) -> Iterator[tuple[str, int]]:
+    """
+    Функция возвращает куски текста, каждый из которых начинается с заголовка платформы,
+    и номер первой строки куска. Текст до первого заголовка пропускается.
+
+    Строку заголовка ищет pattern, он должен соответствовать таблице разбора строк,
+    которой будут разбираться куски.
+
+    """
+
+    starts = [m.start() for m in pattern.finditer(text)]
+    if not starts:
+        return
+
+    line_number = text.count("\n", 0, starts[0]) + 1
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        chunk = text[start:end]
+        yield chunk, line_number
+        line_number += chunk.count("\n")
+
+
+def parse_chunks(
+    parse_batch: Callable[..., list],
+    chunks: list[tuple[str, int]],
+    *args,
+    max_workers: int | None = None,
+) -> list:
+    """
+    Функция разбирает куски текста, полученные из iter_platform_chunks, и возвращает
+    список результатов в порядке кусков.
+
+    parse_batch должна быть функцией уровня модуля: она получает список кусков и args,
+    а возвращает список результатов по каждому куску. Если кусков мало по размеру,
+    то разбор выполняется в текущем процессе, иначе куски делятся на пачки и разбираются
+    в пуле процессов.
+
+    """
+
+    max_workers = max_workers or os.cpu_count() or 1
+
+    total_size = sum(len(chunk) for chunk, _ in chunks)
+    if max_workers == 1 or total_size < PARALLEL_MIN_TEXT_SIZE:
+        return parse_batch(chunks, *args)
+
+    # По несколько пачек на процесс, чтобы процессы загружались равномерно
+    batch_size = max(total_size // (max_workers * 4), PARALLEL_MIN_BATCH_SIZE)
+
+    batches = []
+    batch = []
+    size = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        size += len(chunk[0])
+
+        if size >= batch_size:
+            batches.append(batch)
+            batch = []
+            size = 0
+
+    if batch:
+        batches.append(batch)
+
+    # Пул нужен только большим текстам, а его модули долго импортируются
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    with ProcessPoolExecutor(max_workers) as executor:
+        for batch_results in executor.map(
+            parse_batch, batches, *(repeat(arg, len(batches)) for arg in args)
+        ):
+            results.extend(batch_results)
+
+    return results